@@ -2,13 +2,47 @@
 Script to assign roles to players in the reference database.
 """
 
+import functools
 import sqlite3
 import sys
 import os
 
+_VALID_ROLES = frozenset({"Farmer", "Flex", "Support"})
+_ROLES_BY_LOWER = {r.lower(): r for r in _VALID_ROLES}
+_ROLE_CHOICES = ", ".join(sorted(_VALID_ROLES)) + ", None"
+
+# Returned by _canonicalize for a role that isn't recognised
+_INVALID = object()
+
+def _canonicalize(role):
+    """Return the canonical spelling of a role, None for no role, or _INVALID"""
+    if not role or role.lower() == "none":
+        return None
+    return _ROLES_BY_LOWER.get(role.lower(), _INVALID)
+
+def configure_connection(conn):
+    """Apply pragmas suited to repeated reads of the reference database"""
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-262144")  # 256 MB
+
+def _print_rows(rows, role_heading="Current Role"):
+    """Print player rows as an ID / name / role table"""
+    print(f"\n{'ID':4} {'Name':25} {role_heading:12}")
+    print("-" * 45)
+    for row in rows:
+        role = row[2] if row[2] else "None"
+        print(f"{row[0]:<4} {row[1]:<25} {role:<12}")
+
+@functools.lru_cache(maxsize=16)
 def list_players(db_path, limit=20, offset=0):
-    """List players from the reference database"""
+    """List a page of players from the reference database.
+    
+    Pages are cached; assign_role clears the cache when a role changes.
+    """
     conn = sqlite3.connect(db_path)
+    configure_connection(conn)
     cursor = conn.cursor()
     
     cursor.execute("""
@@ -18,28 +52,114 @@ def list_players(db_path, limit=20, offset=0):
     LIMIT ? OFFSET ?
     """, (limit, offset))
     
-    rows = cursor.fetchall()
+    rows = tuple(cursor.fetchall())
     
-    print(f"\n{'ID':4} {'Name':25} {'Current Role':12}")
-    print("-" * 45)
-    for row in rows:
-        role = row[2] if row[2] else "None"
-        print(f"{row[0]:<4} {row[1]:<25} {role:<12}")
+    conn.close()
+    return rows
+
+def ensure_name_search_index(db_path):
+    """Create the name index, and the FTS5 index used to search player names if it is missing"""
+    conn = sqlite3.connect(db_path)
+    configure_connection(conn)
+    cursor = conn.cursor()
+    
+    # Exact and prefix lookups on name go through a case-insensitive index
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_ref_players_name ON ref_players(name COLLATE NOCASE)")
+    
+    # Once the FTS table and its sync triggers exist the triggers keep it current,
+    # so the full rebuild below is only needed when some of them are new
+    cursor.execute("""
+    SELECT COUNT(*) FROM sqlite_master
+    WHERE name IN ('ref_players_fts', 'ref_players_fts_ai', 'ref_players_fts_ad', 'ref_players_fts_au')
+    """)
+    needs_rebuild = cursor.fetchone()[0] < 4
+    
+    cursor.execute("""
+    CREATE VIRTUAL TABLE IF NOT EXISTS ref_players_fts
+    USING fts5(name, content='ref_players', content_rowid='id', tokenize='unicode61')
+    """)
+    
+    # Keep the index in sync with ref_players
+    cursor.executescript("""
+    CREATE TRIGGER IF NOT EXISTS ref_players_fts_ai AFTER INSERT ON ref_players BEGIN
+        INSERT INTO ref_players_fts(rowid, name) VALUES (new.id, new.name);
+    END;
+    CREATE TRIGGER IF NOT EXISTS ref_players_fts_ad AFTER DELETE ON ref_players BEGIN
+        INSERT INTO ref_players_fts(ref_players_fts, rowid, name) VALUES ('delete', old.id, old.name);
+    END;
+    CREATE TRIGGER IF NOT EXISTS ref_players_fts_au AFTER UPDATE OF name ON ref_players BEGIN
+        INSERT INTO ref_players_fts(ref_players_fts, rowid, name) VALUES ('delete', old.id, old.name);
+        INSERT INTO ref_players_fts(rowid, name) VALUES (new.id, new.name);
+    END;
+    """)
+    
+    if needs_rebuild:
+        cursor.execute("INSERT INTO ref_players_fts(ref_players_fts) VALUES ('rebuild')")
+    conn.commit()
+    conn.close()
+
+def search_players(db_path, search_term, limit=30):
+    """Search players by exact name, user wildcards or name prefix"""
+    conn = sqlite3.connect(db_path)
+    configure_connection(conn)
+    cursor = conn.cursor()
+    
+    if any(c in search_term for c in "%*"):
+        # The user supplied their own wildcards
+        cursor.execute("""
+        SELECT id, name, primary_role
+        FROM ref_players
+        WHERE name LIKE ?
+        ORDER BY name
+        LIMIT ?
+        """, (search_term.replace("*", "%"), limit))
+        rows = cursor.fetchall()
+    else:
+        # A full name is a single probe of the name index
+        cursor.execute("""
+        SELECT id, name, primary_role
+        FROM ref_players
+        WHERE name = ? COLLATE NOCASE
+        LIMIT ?
+        """, (search_term, limit))
+        rows = cursor.fetchall()
+    
+    if not rows and any(c.isalnum() for c in search_term):
+        # Quote the term so FTS5 operators in player names are treated as text
+        match_expr = '"' + search_term.replace('"', '""') + '"*'
+        cursor.execute("""
+        SELECT ref_players.id, ref_players.name, ref_players.primary_role
+        FROM ref_players
+        JOIN ref_players_fts f ON f.rowid = ref_players.id
+        WHERE ref_players_fts MATCH ?
+        ORDER BY rank
+        LIMIT ?
+        """, (match_expr, limit))
+        rows = cursor.fetchall()
+    elif not rows:
+        # Nothing the tokenizer can index (e.g. only punctuation), use an anchored LIKE
+        cursor.execute("""
+        SELECT id, name, primary_role
+        FROM ref_players
+        WHERE name LIKE ?
+        ORDER BY name
+        LIMIT ?
+        """, (f"{search_term}%", limit))
+        rows = cursor.fetchall()
     
     conn.close()
     return rows
 
 def assign_role(db_path, player_id, role):
     """Assign a role to a player"""
-    valid_roles = [None, "Farmer", "Flex", "Support"]
+    role_value = _canonicalize(role)
     
-    if role not in valid_roles and role.lower() != "none":
-        print(f"Error: Invalid role '{role}'. Valid options are: {', '.join([r for r in valid_roles if r])}, None")
+    if role_value is _INVALID:
+        print(f"Error: Invalid role '{role}'. Valid options are: {_ROLE_CHOICES}")
         return False
     
-    role_value = None if role.lower() == "none" else role
-    
     conn = sqlite3.connect(db_path)
+    configure_connection(conn)
     cursor = conn.cursor()
     
     # Verify player exists
@@ -58,6 +178,7 @@ def assign_role(db_path, player_id, role):
     print(f"Role for player '{player[0]}' (ID: {player_id}) set to: {role_value}")
     
     conn.close()
+    list_players.cache_clear()
     return True
 
 def assign_roles_interactive(db_path):
@@ -78,6 +199,7 @@ def assign_roles_interactive(db_path):
         if choice == "1":
             # List next 20 players
             rows = list_players(db_path, limit, offset)
+            _print_rows(rows)
             if rows:
                 offset += limit
             else:
@@ -91,29 +213,12 @@ def assign_roles_interactive(db_path):
                 print("No search term provided.")
                 continue
                 
-            conn = sqlite3.connect(db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-            SELECT id, name, primary_role 
-            FROM ref_players 
-            WHERE name LIKE ?
-            ORDER BY name
-            LIMIT 30
-            """, (f"%{search_term}%",))
-            
-            rows = cursor.fetchall()
+            rows = search_players(db_path, search_term)
             
             if rows:
-                print(f"\n{'ID':4} {'Name':25} {'Current Role':12}")
-                print("-" * 45)
-                for row in rows:
-                    role = row[2] if row[2] else "None"
-                    print(f"{row[0]:<4} {row[1]:<25} {role:<12}")
+                _print_rows(rows)
             else:
                 print(f"No players found matching '{search_term}'")
-                
-            conn.close()
             
         elif choice == "3":
             # Assign role
@@ -126,22 +231,24 @@ def assign_roles_interactive(db_path):
             role = input("Enter role: ").strip()
             
             if role:
-                # Capitalize first letter for consistency
-                role = role[0].upper() + role[1:].lower()
                 assign_role(db_path, int(player_id), role)
                 
         elif choice == "4":
             # View players by role
             print("\nRoles: Farmer, Flex, Support, None")
             role = input("Enter role to view (or leave empty to see all): ").strip()
+            role_value = _canonicalize(role)
+            
+            if role_value is _INVALID:
+                print(f"Error: Invalid role '{role}'. Valid options are: {_ROLE_CHOICES}")
+                continue
             
             conn = sqlite3.connect(db_path)
+            configure_connection(conn)
             cursor = conn.cursor()
             
             if role:
-                # Capitalize first letter for consistency
-                role = role[0].upper() + role[1:].lower()
-                if role.lower() == "none":
+                if role_value is None:
                     cursor.execute("""
                     SELECT id, name, primary_role 
                     FROM ref_players 
@@ -156,7 +263,7 @@ def assign_roles_interactive(db_path):
                     WHERE primary_role = ?
                     ORDER BY name
                     LIMIT 50
-                    """, (role,))
+                    """, (role_value,))
             else:
                 cursor.execute("""
                 SELECT primary_role, COUNT(*) as count
@@ -178,14 +285,10 @@ def assign_roles_interactive(db_path):
             rows = cursor.fetchall()
             
             if rows:
-                print(f"\n{'ID':4} {'Name':25} {'Role':12}")
-                print("-" * 45)
-                for row in rows:
-                    role = row[2] if row[2] else "None"
-                    print(f"{row[0]:<4} {row[1]:<25} {role:<12}")
+                _print_rows(rows, role_heading="Role")
                 print(f"\nFound {len(rows)} players")
             else:
-                print(f"No players found with role '{role}'")
+                print(f"No players found with role '{role_value or 'None'}'")
                 
             conn.close()
                 
@@ -209,9 +312,8 @@ if __name__ == "__main__":
     
     # Check if primary_role column exists
     conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute("PRAGMA table_info(ref_players)")
-    columns = [col[1] for col in cursor.fetchall()]
+    configure_connection(conn)
+    columns = set(col[1] for col in conn.execute("PRAGMA table_info(ref_players)"))
     conn.close()
     
     if 'primary_role' not in columns:
@@ -219,5 +321,8 @@ if __name__ == "__main__":
         print("Please run add_role_columns.py first to add the required columns.")
         sys.exit(1)
     
+    # Build the name search index
+    ensure_name_search_index(db_path)
+    
     # Interactive mode
     assign_roles_interactive(db_path)
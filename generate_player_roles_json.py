@@ -3,9 +3,10 @@ Script to generate a consolidated player roles JSON file.
 """
 
 import os
-import json
+import orjson
 import sqlite3
 import sys
+from collections import Counter
 
 def generate_player_roles_json(db_path, output_dir):
     """Generate a JSON file mapping player names/hashes to their primary roles"""
@@ -32,79 +33,60 @@ def generate_player_roles_json(db_path, output_dir):
     print(f"Found {role_count} player stats records with roles")
     print(f"Reference database exists: {has_ref_db}")
     
-    # Dictionary to store player roles {player_name: role, player_hash: role}
-    player_roles = {}
-    
-    # 1. Get roles from player_stats table
-    cursor.execute("""
-    SELECT 
-        ps.player_name, 
-        ps.player_hash, 
-        ps.role,
-        COUNT(*) as appearances
-    FROM player_stats ps
-    WHERE ps.role IS NOT NULL
-    GROUP BY ps.player_name, ps.role
+    # 1. Get the most common role for each player from the player_stats table
+    # (some players might have multiple roles)
+    query = """
+    WITH stats_roles AS (
+        SELECT player_name, role, appearances
+        FROM (
+            SELECT 
+                ps.player_name, 
+                ps.role,
+                COUNT(*) as appearances,
+                ROW_NUMBER() OVER (PARTITION BY ps.player_name ORDER BY COUNT(*) DESC, ps.role) as rn
+            FROM player_stats ps
+            WHERE ps.role IS NOT NULL
+            GROUP BY ps.player_name, ps.role
+        )
+        WHERE rn = 1
+    )
+    SELECT player_name, role, appearances
+    FROM stats_roles
+    """
+    
+    # 2. Add roles from the reference database if available, but only for
+    # players we don't already have a role for
+    if has_ref_db:
+        conn.execute("ATTACH DATABASE ? AS refdb", (ref_db_path,))
+        query += """
+    UNION ALL
+    SELECT r.name, r.primary_role, 0
+    FROM refdb.ref_players r
+    WHERE r.primary_role IS NOT NULL
+    AND r.name NOT IN (SELECT player_name FROM stats_roles)
+    """
+    
+    # Build the {player_name: role} mapping straight from the cursor's
+    # (name, role) pairs, without an intermediate row list
+    cursor.execute(f"""
+    SELECT player_name, role
+    FROM ({query})
     ORDER BY appearances DESC
     """)
-    
-    # Get most common role for each player (some players might have multiple roles)
-    player_role_counts = {}
-    for row in cursor.fetchall():
-        player_name = row['player_name']
-        player_hash = row['player_hash']
-        role = row['role']
-        count = row['appearances']
-        
-        if player_name not in player_role_counts:
-            player_role_counts[player_name] = {}
-        
-        if role not in player_role_counts[player_name]:
-            player_role_counts[player_name][role] = 0
-        
-        player_role_counts[player_name][role] += count
-    
-    # Assign most frequent role to each player
-    for player, role_counts in player_role_counts.items():
-        most_frequent_role = max(role_counts.items(), key=lambda x: x[1])[0]
-        player_roles[player] = most_frequent_role
-    
-    # 2. Get roles from reference database if available
-    if has_ref_db:
-        ref_conn = sqlite3.connect(ref_db_path)
-        ref_conn.row_factory = sqlite3.Row
-        ref_cursor = ref_conn.cursor()
-        
-        ref_cursor.execute("""
-        SELECT name, primary_role 
-        FROM ref_players 
-        WHERE primary_role IS NOT NULL
-        """)
-        
-        for row in ref_cursor.fetchall():
-            player_name = row['name']
-            role = row['primary_role']
-            
-            # Only add from reference DB if we don't already have a role
-            if player_name not in player_roles:
-                player_roles[player_name] = role
-        
-        ref_conn.close()
+    player_roles = dict(cursor)
     
     # 3. Write the roles to JSON
     print(f"Writing roles for {len(player_roles)} players to player_roles.json")
-    with open(os.path.join(output_dir, "player_roles.json"), 'w') as f:
-        json.dump(player_roles, f, indent=2)
+    with open(os.path.join(output_dir, "player_roles.json"), 'wb') as f:
+        f.write(orjson.dumps(player_roles, option=orjson.OPT_INDENT_2))
     
     # Display summary
-    farmer_count = sum(1 for role in player_roles.values() if role == 'Farmer')
-    flex_count = sum(1 for role in player_roles.values() if role == 'Flex')
-    support_count = sum(1 for role in player_roles.values() if role == 'Support')
+    role_counts = Counter(player_roles.values())
     
     print("\n=== Role Distribution ===")
-    print(f"Farmer: {farmer_count} players")
-    print(f"Flex: {flex_count} players")
-    print(f"Support: {support_count} players")
+    print(f"Farmer: {role_counts['Farmer']} players")
+    print(f"Flex: {role_counts['Flex']} players")
+    print(f"Support: {role_counts['Support']} players")
     print(f"Total: {len(player_roles)} players with roles")
     
     conn.close()
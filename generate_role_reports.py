@@ -2,96 +2,213 @@
 Script to generate reports with role support.
 """
 
+import functools
+import io
 import os
-import json
+import orjson
 import sqlite3
 import sys
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from itertools import groupby
+from pathlib import Path
 
-def generate_role_based_reports(conn, output_dir):
-    """Generate player performance reports filtered by role"""
-    valid_roles = ["Farmer", "Flex", "Support"]
+VALID_ROLES = ["Farmer", "Flex", "Support"]
+MATCH_TYPES = ['team', 'pickup', 'ranked']
+
+BUNDLE_FILENAME = "role_reports.zip"
+
+_ROLE_PLACEHOLDERS = ", ".join("?" for _ in VALID_ROLES)
+_MT_PLACEHOLDERS = ", ".join("?" for _ in MATCH_TYPES)
+
+# Per player aggregate columns shared by the role report views; {games}
+# is the expression counting the games each group covers
+_AGG_COLUMNS = """
+        ps.player_name as name, ps.player_hash as hash,
+        {games} as games_played,
+        SUM(CASE WHEN ps.is_subbing = 0 THEN 1 ELSE 0 END) as regular_games,
+        SUM(CASE WHEN ps.is_subbing = 1 THEN 1 ELSE 0 END) as sub_games,
+        SUM(ps.score) as total_score,
+        ROUND(AVG(ps.score), 2) as avg_score,
+        SUM(ps.kills) as total_kills,
+        SUM(ps.deaths) as total_deaths,
+        CASE WHEN {games} > 0 THEN ROUND(1.0 * SUM(ps.deaths) / {games}, 2) ELSE 0 END as deaths_per_game,
+        SUM(ps.kills) - SUM(ps.deaths) as net_kills,
+        CASE WHEN {games} > 0 THEN ROUND(1.0 * (SUM(ps.kills) - SUM(ps.deaths)) / {games}, 2) ELSE 0 END as net_kills_per_game,
+        CASE WHEN SUM(ps.deaths) > 0 THEN ROUND(1.0 * SUM(ps.kills) / SUM(ps.deaths), 2) ELSE SUM(ps.kills) END as kd_ratio,
+        SUM(ps.assists) as total_assists,
+        SUM(ps.ai_kills) as total_ai_kills,
+        CASE WHEN {games} > 0 THEN ROUND(1.0 * SUM(ps.ai_kills) / {games}, 2) ELSE 0 END as ai_kills_per_game,
+        SUM(ps.cap_ship_damage) as total_cap_ship_damage,
+        CASE WHEN {games} > 0 THEN ROUND(1.0 * SUM(ps.cap_ship_damage) / {games}, 2) ELSE 0 END as damage_per_game
+"""
+
+# Player performance for every role in a single pass
+SQL_ROLE = f"""
+SELECT *
+FROM v_player_role_agg
+WHERE role IN ({_ROLE_PLACEHOLDERS})
+ORDER BY role, avg_score DESC
+"""
+
+# Player performance for every role and match type in a single pass
+SQL_ROLE_MT = f"""
+SELECT *
+FROM v_player_role_mt_agg
+WHERE role IN ({_ROLE_PLACEHOLDERS}) AND match_type IN ({_MT_PLACEHOLDERS})
+ORDER BY role, match_type, avg_score DESC
+"""
+
+def configure_connection(conn):
+    """Apply pragmas suited to the bulk read workload of these reports"""
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-262144")  # 256 MB
+
+def configure_read_connection(conn):
+    """Apply pragmas for the read-only report connections, leaving the journal mode alone"""
+    # No query_only here: mode=ro already protects the database file, and the
+    # reports build their temp tables and views on these connections
+    conn.execute("PRAGMA mmap_size=268435456")  # 256 MB
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-262144")  # 256 MB
+
+def _db_version(db_path):
+    """Return a key that changes whenever the database contents change.
+    
+    Pending changes live in the WAL file, which only grows until a checkpoint
+    copies it into the database file, so its size is used rather than its
+    mtime (which changes every time a connection opens).
+    """
+    wal_path = db_path + "-wal"
+    wal_size = os.path.getsize(wal_path) if os.path.exists(wal_path) else 0
+    return (os.path.getmtime(db_path), wal_size)
+
+@functools.lru_cache(maxsize=8)
+def _schema(db_path, version):
+    """Return the player_stats column names, cached until the database file changes"""
+    conn = sqlite3.connect(db_path)
+    try:
+        return frozenset(col[1] for col in conn.execute("PRAGMA table_info(player_stats)"))
+    finally:
+        conn.close()
+
+def _materialize_roles(conn):
+    """Copy the role-annotated player stats, joined to their match type, into a temp table"""
+    conn.execute("""
+    CREATE TEMP TABLE IF NOT EXISTS t_roles AS
+    SELECT ps.player_hash, ps.player_name, ps.match_id, m.match_type, ps.role,
+           ps.is_subbing, ps.score, ps.kills, ps.deaths, ps.assists,
+           ps.ai_kills, ps.cap_ship_damage
+    FROM player_stats ps
+    JOIN matches m ON ps.match_id = m.id
+    WHERE ps.role IS NOT NULL
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS temp.idx_t_roles ON t_roles(role, match_type, player_hash)")
+
+def _ensure_views(conn):
+    """Create the per player aggregation views used by the role reports"""
+    # With one row per player per match, COUNT(*) gives the games played
+    # without the per-group set COUNT(DISTINCT match_id) has to build
+    duplicates = conn.execute("""
+    SELECT COUNT(*) - COUNT(DISTINCT match_id || '|' || player_hash) FROM t_roles
+    """).fetchone()[0]
+    games = "COUNT(*)" if duplicates == 0 else "COUNT(DISTINCT ps.match_id)"
+    agg_columns = _AGG_COLUMNS.format(games=games)
     
+    conn.execute(f"""
+    CREATE TEMP VIEW IF NOT EXISTS v_player_role_agg AS
+    SELECT ps.role as role, {agg_columns}
+    FROM t_roles ps
+    GROUP BY ps.role, ps.player_hash
+    """)
+    conn.execute(f"""
+    CREATE TEMP VIEW IF NOT EXISTS v_player_role_mt_agg AS
+    SELECT ps.role as role, ps.match_type as match_type, {agg_columns}
+    FROM t_roles ps
+    GROUP BY ps.role, ps.match_type, ps.player_hash
+    """)
+
+def _open_report(output_dir, filename, bundle=None):
+    """Open a report for binary writing, either in output_dir or inside an open zip bundle"""
+    if bundle is not None:
+        return bundle.open(filename, 'w')
+    return open(os.path.join(output_dir, filename), 'wb')
+
+def stream_json_array(rows, fp):
+    """Write rows to a binary file as a JSON array one row at a time, returning the row count"""
+    count = 0
+    fp.write(b"[\n")
+    for row in rows:
+        if count:
+            fp.write(b",\n")
+        fp.write(orjson.dumps(dict(row)))
+        count += 1
+    fp.write(b"\n]")
+    return count
+
+def _run_report(report, db_path, output_dir, bundle=None):
+    """Run one report generator on its own read-only connection, returning its console output"""
+    # Reports run side by side, so each one's progress lines are collected
+    # here and printed by the caller once the report is done
+    output = io.StringIO()
+    db_uri = Path(os.path.abspath(db_path)).as_uri() + "?mode=ro"
+    conn = sqlite3.connect(db_uri, uri=True)
+    configure_read_connection(conn)
+    conn.row_factory = sqlite3.Row  # Enable row factory for named columns
+    
+    try:
+        # Read the whole report from one consistent snapshot; a deferred
+        # transaction never takes the write lock
+        conn.execute("BEGIN DEFERRED")
+        report(conn, output_dir, bundle, out=functools.partial(print, file=output))
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+    return output.getvalue()
+
+def generate_role_based_reports(conn, output_dir, bundle=None, out=print):
+    """Generate player performance reports filtered by role"""
     # Check if output directory exists, create if not
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
     
-    print("Generating role-based reports...")
-    
-    for role in valid_roles:
-        # Generate player performance report for this role
-        cursor = conn.cursor()
-        cursor.execute("""
-        SELECT ps.player_name as name, ps.player_hash as hash,
-                COUNT(DISTINCT ps.match_id) as games_played,
-                SUM(CASE WHEN ps.is_subbing = 0 THEN 1 ELSE 0 END) as regular_games,
-                SUM(CASE WHEN ps.is_subbing = 1 THEN 1 ELSE 0 END) as sub_games,
-                SUM(ps.score) as total_score,
-                ROUND(AVG(ps.score), 2) as avg_score,
-                SUM(ps.kills) as total_kills,
-                SUM(ps.deaths) as total_deaths,
-                CASE WHEN COUNT(DISTINCT ps.match_id) > 0 THEN ROUND(CAST(SUM(ps.deaths) AS FLOAT) / COUNT(DISTINCT ps.match_id), 2) ELSE 0 END as deaths_per_game,
-                SUM(ps.kills) - SUM(ps.deaths) as net_kills,
-                CASE WHEN COUNT(DISTINCT ps.match_id) > 0 THEN ROUND(CAST(SUM(ps.kills) - SUM(ps.deaths) AS FLOAT) / COUNT(DISTINCT ps.match_id), 2) ELSE 0 END as net_kills_per_game,
-                CASE WHEN SUM(ps.deaths) > 0 THEN ROUND(CAST(SUM(ps.kills) AS FLOAT) / SUM(ps.deaths), 2) ELSE SUM(ps.kills) END as kd_ratio,
-                SUM(ps.assists) as total_assists,
-                SUM(ps.ai_kills) as total_ai_kills,
-                CASE WHEN COUNT(DISTINCT ps.match_id) > 0 THEN ROUND(CAST(SUM(ps.ai_kills) AS FLOAT) / COUNT(DISTINCT ps.match_id), 2) ELSE 0 END as ai_kills_per_game,
-                SUM(ps.cap_ship_damage) as total_cap_ship_damage,
-                CASE WHEN COUNT(DISTINCT ps.match_id) > 0 THEN ROUND(CAST(SUM(ps.cap_ship_damage) AS FLOAT) / COUNT(DISTINCT ps.match_id), 2) ELSE 0 END as damage_per_game
-        FROM player_stats ps
-        JOIN matches m ON ps.match_id = m.id
-        WHERE ps.role = ?
-        GROUP BY ps.player_hash
-        ORDER BY avg_score DESC
-        """, (role,))
-        
-        player_performance_by_role = [dict(row) for row in cursor.fetchall()]
-        
-        if player_performance_by_role:  # Only write file if there's data
-            role_filename = f"player_performance_role_{role.lower()}.json"
-            with open(os.path.join(output_dir, role_filename), 'w') as f:
-                json.dump(player_performance_by_role, f, indent=2)
-            print(f"  - {role} Role Report: {len(player_performance_by_role)} players")
-        else:
-            print(f"  - {role} Role Report: No data found")
-        
-        # Also generate match type specific role reports for each match type
-        match_types = ['team', 'pickup', 'ranked']
-        for mt in match_types:
-            cursor.execute("""
-            SELECT ps.player_name as name, ps.player_hash as hash,
-                    COUNT(DISTINCT ps.match_id) as games_played,
-                    SUM(CASE WHEN ps.is_subbing = 0 THEN 1 ELSE 0 END) as regular_games,
-                    SUM(CASE WHEN ps.is_subbing = 1 THEN 1 ELSE 0 END) as sub_games,
-                    SUM(ps.score) as total_score,
-                    ROUND(AVG(ps.score), 2) as avg_score,
-                    SUM(ps.kills) as total_kills,
-                    SUM(ps.deaths) as total_deaths,
-                    CASE WHEN COUNT(DISTINCT ps.match_id) > 0 THEN ROUND(CAST(SUM(ps.deaths) AS FLOAT) / COUNT(DISTINCT ps.match_id), 2) ELSE 0 END as deaths_per_game,
-                    SUM(ps.kills) - SUM(ps.deaths) as net_kills,
-                    CASE WHEN COUNT(DISTINCT ps.match_id) > 0 THEN ROUND(CAST(SUM(ps.kills) - SUM(ps.deaths) AS FLOAT) / COUNT(DISTINCT ps.match_id), 2) ELSE 0 END as net_kills_per_game,
-                    CASE WHEN SUM(ps.deaths) > 0 THEN ROUND(CAST(SUM(ps.kills) AS FLOAT) / SUM(ps.deaths), 2) ELSE SUM(ps.kills) END as kd_ratio,
-                    SUM(ps.assists) as total_assists,
-                    SUM(ps.ai_kills) as total_ai_kills,
-                    CASE WHEN COUNT(DISTINCT ps.match_id) > 0 THEN ROUND(CAST(SUM(ps.ai_kills) AS FLOAT) / COUNT(DISTINCT ps.match_id), 2) ELSE 0 END as ai_kills_per_game,
-                    SUM(ps.cap_ship_damage) as total_cap_ship_damage,
-                    CASE WHEN COUNT(DISTINCT ps.match_id) > 0 THEN ROUND(CAST(SUM(ps.cap_ship_damage) AS FLOAT) / COUNT(DISTINCT ps.match_id), 2) ELSE 0 END as damage_per_game
-            FROM player_stats ps
-            JOIN matches m ON ps.match_id = m.id
-            WHERE ps.role = ? AND m.match_type = ?
-            GROUP BY ps.player_hash
-            ORDER BY avg_score DESC
-            """, (role, mt))
-            
-            data = [dict(row) for row in cursor.fetchall()]
-            
-            if data:  # Only write file if there's data
-                filename = f"player_performance_{mt}_role_{role.lower()}.json"
-                with open(os.path.join(output_dir, filename), 'w') as f:
-                    json.dump(data, f, indent=2)
-                print(f"    - {role} Role + {mt.capitalize()} Report: {len(data)} players")
-
-def generate_role_distribution_report(conn, output_dir):
+    out("Generating role-based reports...")
+    
+    # Both role reports read the role-annotated rows, so pull them out of
+    # player_stats once. The distribution and team reports also cover
+    # players without a role and keep reading player_stats directly.
+    _materialize_roles(conn)
+    _ensure_views(conn)
+    
+    cursor = conn.cursor()
+    
+    # Rows come back ordered by role, so each report is streamed straight to its file
+    cursor.execute(SQL_ROLE, VALID_ROLES)
+    columns = [d[0] for d in cursor.description if d[0] != 'role']
+    roles_with_data = set()
+    for role, rows in groupby(cursor, key=lambda row: row['role']):
+        role_filename = f"player_performance_role_{role.lower()}.json"
+        with _open_report(output_dir, role_filename, bundle) as f:
+            count = stream_json_array(({c: row[c] for c in columns} for row in rows), f)
+        roles_with_data.add(role)
+        out(f"  - {role} Role Report: {count} players")
+    
+    for role in VALID_ROLES:
+        if role not in roles_with_data:
+            out(f"  - {role} Role Report: No data found")
+    
+    # Also generate match type specific role reports for each match type
+    cursor.execute(SQL_ROLE_MT, VALID_ROLES + MATCH_TYPES)
+    columns = [d[0] for d in cursor.description if d[0] not in ('role', 'match_type')]
+    for (role, mt), rows in groupby(cursor, key=lambda row: (row['role'], row['match_type'])):
+        filename = f"player_performance_{mt}_role_{role.lower()}.json"
+        with _open_report(output_dir, filename, bundle) as f:
+            count = stream_json_array(({c: row[c] for c in columns} for row in rows), f)
+        out(f"    - {role} Role + {mt.capitalize()} Report: {count} players")
+
+def generate_role_distribution_report(conn, output_dir, bundle=None, out=print):
     """Generate a report showing the distribution of roles"""
     cursor = conn.cursor()
     
@@ -105,7 +222,7 @@ def generate_role_distribution_report(conn, output_dir):
         ROUND(AVG(ps.kills), 2) as avg_kills,
         ROUND(AVG(ps.deaths), 2) as avg_deaths,
         CASE WHEN SUM(ps.deaths) > 0 
-            THEN ROUND(CAST(SUM(ps.kills) AS FLOAT) / SUM(ps.deaths), 2)
+            THEN ROUND(1.0 * SUM(ps.kills) / SUM(ps.deaths), 2)
             ELSE SUM(ps.kills) END as overall_kd_ratio
     FROM player_stats ps
     GROUP BY ps.role
@@ -125,7 +242,7 @@ def generate_role_distribution_report(conn, output_dir):
         ROUND(AVG(ps.kills), 2) as avg_kills,
         ROUND(AVG(ps.deaths), 2) as avg_deaths,
         CASE WHEN SUM(ps.deaths) > 0 
-            THEN ROUND(CAST(SUM(ps.kills) AS FLOAT) / SUM(ps.deaths), 2)
+            THEN ROUND(1.0 * SUM(ps.kills) / SUM(ps.deaths), 2)
             ELSE SUM(ps.kills) END as overall_kd_ratio
     FROM player_stats ps
     JOIN matches m ON ps.match_id = m.id
@@ -133,27 +250,25 @@ def generate_role_distribution_report(conn, output_dir):
     ORDER BY ps.role, m.match_type
     """)
     
-    role_distribution_by_match_type = [dict(row) for row in cursor.fetchall()]
+    # Write reports, streaming the per match type rows straight from the cursor
+    with _open_report(output_dir, "role_distribution_by_match_type.json", bundle) as f:
+        by_match_type_count = stream_json_array(cursor, f)
     
-    # Write reports
-    with open(os.path.join(output_dir, "role_distribution.json"), 'w') as f:
-        json.dump(role_distribution, f, indent=2)
+    with _open_report(output_dir, "role_distribution.json", bundle) as f:
+        stream_json_array(role_distribution, f)
     
-    with open(os.path.join(output_dir, "role_distribution_by_match_type.json"), 'w') as f:
-        json.dump(role_distribution_by_match_type, f, indent=2)
-    
-    print(f"  - Role Distribution: {len(role_distribution)} roles")
-    print(f"  - Role Distribution by Match Type: {len(role_distribution_by_match_type)} role-match type combinations")
+    out(f"  - Role Distribution: {len(role_distribution)} roles")
+    out(f"  - Role Distribution by Match Type: {by_match_type_count} role-match type combinations")
     
     # Print summary table
-    print("\n=== Role Distribution Summary ===")
-    print(f"{'Role':12} {'Players':8} {'Appearances':12} {'Avg Score':10} {'K/D Ratio':10}")
-    print("-" * 55)
+    out("\n=== Role Distribution Summary ===")
+    out(f"{'Role':12} {'Players':8} {'Appearances':12} {'Avg Score':10} {'K/D Ratio':10}")
+    out("-" * 55)
     for row in role_distribution:
         role_name = row['role'] if row['role'] else "None"
-        print(f"{role_name:<12} {row['unique_players']:<8} {row['total_appearances']:<12} {row['avg_score']:<10} {row['overall_kd_ratio']:<10}")
+        out(f"{role_name:<12} {row['unique_players']:<8} {row['total_appearances']:<12} {row['avg_score']:<10} {row['overall_kd_ratio']:<10}")
 
-def generate_player_team_roles_report(conn, output_dir):
+def generate_player_team_roles_report(conn, output_dir, bundle=None, out=print):
     """Generate a report showing players' teams and roles"""
     cursor = conn.cursor()
     
@@ -170,40 +285,63 @@ def generate_player_team_roles_report(conn, output_dir):
     ORDER BY ps.player_name, games_with_team DESC
     """)
     
-    player_teams = [dict(row) for row in cursor.fetchall()]
-    
-    with open(os.path.join(output_dir, "player_teams_roles.json"), 'w') as f:
-        json.dump(player_teams, f, indent=2)
+    with _open_report(output_dir, "player_teams_roles.json", bundle) as f:
+        count = stream_json_array(cursor, f)
     
-    print(f"  - Player Teams and Roles: {len(player_teams)} player-team-role combinations")
+    out(f"  - Player Teams and Roles: {count} player-team-role combinations")
 
-def main(db_path, output_dir):
-    """Generate all role-based reports"""
+def main(db_path, output_dir, bundle=False):
+    """Generate all role-based reports, optionally bundled into a single zip file"""
     if not os.path.exists(db_path):
         print(f"Error: Database file not found: {db_path}")
         return False
     
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = sqlite3.Row  # Enable row factory for named columns
-    
     # Check if role column exists
-    cursor = conn.cursor()
-    cursor.execute("PRAGMA table_info(player_stats)")
-    columns = [col[1] for col in cursor.fetchall()]
+    columns = _schema(db_path, _db_version(db_path))
     
     if 'role' not in columns:
         print("Error: 'role' column not found in player_stats table.")
         print("Please run add_role_columns.py first to add the required columns.")
-        conn.close()
         return False
     
+    conn = sqlite3.connect(db_path)
+    configure_connection(conn)
+    cursor = conn.cursor()
+    
+    # Index the role columns so the role reports don't scan all of player_stats.
+    # Only re-analyze when an index is new, so repeated runs leave the file untouched.
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'player_stats'")
+    existing_indexes = set(row[0] for row in cursor.fetchall())
+    if not {'idx_ps_role_hash', 'idx_ps_role_match'} <= existing_indexes:
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_ps_role_hash ON player_stats(role, player_hash, match_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_ps_role_match ON player_stats(role, match_id, is_subbing)")
+        cursor.execute("ANALYZE player_stats")
+        conn.commit()
+    conn.close()
+    
     # Generate reports
     print(f"Generating role-based reports from {db_path} to {output_dir}...")
-    generate_role_based_reports(conn, output_dir)
-    generate_role_distribution_report(conn, output_dir)
-    generate_player_team_roles_report(conn, output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+    
+    reports = [generate_role_based_reports, generate_role_distribution_report, generate_player_team_roles_report]
+    
+    # The reports are independent and read-only, so each runs on its own
+    # connection. A zip bundle only accepts one writer at a time, so the
+    # reports run one after another when bundling.
+    zf = None
+    if bundle:
+        zf = zipfile.ZipFile(os.path.join(output_dir, BUNDLE_FILENAME), 'w', compression=zipfile.ZIP_STORED)
+    try:
+        with ThreadPoolExecutor(max_workers=1 if bundle else len(reports)) as executor:
+            futures = [executor.submit(_run_report, report, db_path, output_dir, zf) for report in reports]
+            # Print each report's output whole and in submission order, so
+            # the reports' lines and the summary table never interleave
+            for future in futures:
+                sys.stdout.write(future.result())
+    finally:
+        if zf is not None:
+            zf.close()
     
-    conn.close()
     print("Role-based reports generated successfully!")
     return True
 
@@ -211,9 +349,13 @@ if __name__ == "__main__":
     db_path = "squadrons_stats_test.db"
     output_dir = "stats_reports_test"
     
-    if len(sys.argv) > 1:
-        db_path = sys.argv[1]
-    if len(sys.argv) > 2:
-        output_dir = sys.argv[2]
+    # --bundle writes every report into role_reports.zip instead of separate files
+    args = [arg for arg in sys.argv[1:] if arg != "--bundle"]
+    bundle = len(args) < len(sys.argv) - 1
+    
+    if len(args) > 0:
+        db_path = args[0]
+    if len(args) > 1:
+        output_dir = args[1]
     
-    main(db_path, output_dir)
+    main(db_path, output_dir, bundle)
@@ -1,73 +1,256 @@
 """
-Script to process a sample of match data with role support.
+Script to process match data with role support.
 """
 
+import functools
 import os
-import json
+import orjson
 import sqlite3
 import sys
 from datetime import datetime
 import hashlib
 
-def get_player_role(ref_db_path, player_name):
-    """Get a player's primary role from the reference database"""
+# ijson is optional; with it season files are parsed one season at a time
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# Hot statements are kept as module constants so every execute passes the
+# same SQL text and hits the connection's prepared statement cache.
+
+# Case-insensitive lookup that still prefers an exact match when names
+# differ only by case
+SQL_SELECT_ROLE = """
+SELECT name, primary_role 
+FROM ref_players 
+WHERE name = ? COLLATE NOCASE
+ORDER BY name = ? DESC
+LIMIT 1
+"""
+
+# Get-or-create in one statement: the no-op update on conflict lets
+# RETURNING hand back the id of an existing row as well as a new one
+SQL_UPSERT_SEASON = """
+INSERT INTO seasons (name) VALUES (?)
+ON CONFLICT(name) DO UPDATE SET name = excluded.name
+RETURNING id
+"""
+
+SQL_UPSERT_TEAM = """
+INSERT INTO teams (name) VALUES (?)
+ON CONFLICT(name) DO UPDATE SET name = excluded.name
+RETURNING id
+"""
+
+SQL_UPSERT_PLAYER = """
+INSERT INTO players (name, player_hash) VALUES (?, ?)
+ON CONFLICT(name) DO UPDATE SET name = excluded.name
+RETURNING id
+"""
+
+SQL_INSERT_PLAYER_STATS = """
+INSERT INTO player_stats (
+    match_id, player_id, player_name, player_hash, team_id, faction, position, role,
+    score, kills, deaths, assists, ai_kills, cap_ship_damage, is_subbing
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Keywords in an upper-cased match result that name the winning faction,
+# checked in order ("REPUBLIC" also covers "NEW REPUBLIC")
+WINNER_KEYWORDS = (
+    ("IMPERIAL", ("IMPERIAL", "EMPIRE")),
+    ("REBEL", ("REBEL", "REPUBLIC")),
+)
+
+# Stats schema version stamped into PRAGMA user_version once migrated
+SCHEMA_VERSION = 1
+
+def configure_connection(conn):
+    """Apply pragmas suited to writing a match into the stats database"""
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-64000")  # 64 MB
+
+@functools.lru_cache(maxsize=None)
+def _player_hash(player_name):
+    """Return the stable 16 character player hash, computed once per name"""
+    # Stored hashes are SHA-256 based, so a faster digest would break existing rows
+    return hashlib.sha256(player_name.encode('utf-8')).hexdigest()[:16]
+
+def open_reference_db(ref_db_path):
+    """Open the reference database once for all role lookups, or None if it doesn't exist"""
     if not os.path.exists(ref_db_path):
         return None
-        
-    conn = sqlite3.connect(ref_db_path)
-    cursor = conn.cursor()
     
-    # Try exact match first
-    cursor.execute("""
-    SELECT name, primary_role 
-    FROM ref_players 
-    WHERE name = ?
-    """, (player_name,))
+    conn = sqlite3.connect(ref_db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-64000")  # 64 MB
+    # Same index assign_roles.py uses, so the NOCASE lookup is a B-tree search
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_ref_players_name ON ref_players(name COLLATE NOCASE)")
+    return conn
+
+def get_player_role(cursor, player_name, cache=None):
+    """Get a player's primary role using a reference database cursor, memoized in cache if given"""
+    if cursor is None:
+        return None
+    if cache is not None and player_name in cache:
+        return cache[player_name]
     
+    cursor.execute(SQL_SELECT_ROLE, (player_name, player_name))
     result = cursor.fetchone()
     
-    # If no exact match, try case-insensitive match
-    if not result:
-        cursor.execute("""
-        SELECT name, primary_role 
-        FROM ref_players 
-        WHERE LOWER(name) = LOWER(?)
-        """, (player_name,))
-        result = cursor.fetchone()
-        if result and result[0] != player_name:
-            print(f"Note: Found role using case-insensitive match: DB='{result[0]}' vs Match='{player_name}'")
-    
-    conn.close()
-    
-    if result:
-        return result[1]  # primary_role
-    return None
+    if result and result[0] != player_name:
+        print(f"Note: Found role using case-insensitive match: DB='{result[0]}' vs Match='{player_name}'")
+    
+    primary_role = result[1] if result else None
+    if cache is not None:
+        cache[player_name] = primary_role
+    return primary_role
 
-def process_sample_match(json_path, output_db_path, ref_db_path):
-    """Process a sample match with role support"""
-    if not os.path.exists(json_path):
-        print(f"Error: JSON file not found: {json_path}")
-        return False
+def prefetch_player_roles(cursor, player_names, cache):
+    """Fill cache with the primary roles of all player_names using a single query"""
+    if cursor is None:
+        return
+    
+    names = list(dict.fromkeys(player_names))
+    if not names:
+        return
+    
+    # Pad the IN list to a power of two so rosters of similar size share one
+    # cached statement; the NULL padding never matches
+    size = 1 << (len(names) - 1).bit_length()
+    placeholders = ", ".join("?" for _ in range(size))
+    cursor.execute(f"""
+    SELECT name, primary_role 
+    FROM ref_players 
+    WHERE name COLLATE NOCASE IN ({placeholders})
+    """, names + [None] * (size - len(names)))
+    
+    exact = {}
+    by_lower = {}
+    for name, primary_role in cursor:
+        exact[name] = primary_role
+        by_lower.setdefault(name.lower(), (name, primary_role))
+    
+    for player_name in names:
+        if player_name in exact:
+            cache[player_name] = exact[player_name]
+        elif player_name.lower() in by_lower:
+            db_name, primary_role = by_lower[player_name.lower()]
+            print(f"Note: Found role using case-insensitive match: DB='{db_name}' vs Match='{player_name}'")
+            cache[player_name] = primary_role
+        else:
+            cache[player_name] = None
+
+def _match_winner(match_result):
+    """Return IMPERIAL, REBEL or UNKNOWN for a match result string"""
+    result = match_result.upper()
+    for winner, keywords in WINNER_KEYWORDS:
+        if any(keyword in result for keyword in keywords):
+            return winner
+    return "UNKNOWN"
+
+def _player_name(player):
+    """Return the name of a player entry, which is either a dict or a bare name"""
+    if isinstance(player, dict):
+        return player.get("player", "Unknown")
+    return str(player)
+
+def _choose_roles(role_cursor, players, role_cache):
+    """Ask for each player's role in this match, returning the chosen roles in player order"""
+    roles = []
+    for player in players:
+        player_name = _player_name(player)
         
-    # Read the JSON file
-    with open(json_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+        # Get primary role from reference db
+        primary_role = get_player_role(role_cursor, player_name, role_cache)
+        print(f"\nPlayer: {player_name} (Primary role: {primary_role or 'None'})")
         
-    # Get the first match from the data
-    if not data:
-        print("Error: No data found in JSON file")
-        return False
+        # Allow role override
+        valid_roles = ["Farmer", "Flex", "Support"]
+        role_options_str = ", ".join(valid_roles)
+        if primary_role:
+            role_prompt = f"Enter role for this match ({role_options_str}) or press Enter to keep primary role: "
+        else:
+            role_prompt = f"Enter role for this match ({role_options_str}) or press Enter for no role: "
         
-    season_name = list(data.keys())[0]
-    match_file = list(data[season_name].keys())[0]
-    match_data = data[season_name][match_file]
-    
-    print(f"Processing sample match: {match_file}")
-    print(f"Match result: {match_data.get('match_result', 'Unknown')}")
+        user_role = input(role_prompt).strip()
+        
+        if user_role:
+            # Normalize input (capitalize first letter only)
+            user_role = user_role[0].upper() + user_role[1:].lower()
+            if user_role in valid_roles:
+                player_role = user_role
+                print(f"Using role for this match: {player_role}")
+            else:
+                print(f"Invalid role '{user_role}'. Using primary role.")
+                player_role = primary_role
+        else:
+            player_role = primary_role
+        
+        roles.append(player_role)
+    return roles
+
+def _process_faction(cursor, players, roles, faction, team_id, match_id, match_type, rows_out):
+    """Create the players of one faction and queue their stats rows with the chosen roles"""
+    # Set team_id based on match type, once for the whole faction
+    team_id_value = None if match_type in ('pickup', 'ranked') else team_id
     
-    # Create the database if it doesn't exist
-    conn = sqlite3.connect(output_db_path)
+    for player, player_role in zip(players, roles):
+        player_name = _player_name(player)
+        if isinstance(player, dict):
+            position = player.get("position", "")
+            score = player.get("score", 0)
+            kills = player.get("kills", 0)
+            deaths = player.get("deaths", 0)
+            assists = player.get("assists", 0)
+            ai_kills = player.get("ai_kills", 0)
+            cap_ship_damage = player.get("cap_ship_damage", 0)
+        else:
+            position = ""
+            score = 0
+            kills = 0
+            deaths = 0
+            assists = 0
+            ai_kills = 0
+            cap_ship_damage = 0
+        
+        # Generate player hash
+        player_hash = _player_hash(player_name)
+        
+        # Get or create player
+        cursor.execute(SQL_UPSERT_PLAYER, (player_name, player_hash))
+        player_id = cursor.fetchone()[0]
+        
+        # Queue player stats
+        rows_out.append((
+            match_id, player_id, player_name, player_hash, team_id_value, faction, position, player_role,
+            score, kills, deaths, assists, ai_kills, cap_ship_damage, 0
+        ))
+
+def iter_matches(json_path):
+    """Yield (season_name, match_file, match_data) for every match in a results file"""
+    if ijson is not None:
+        # Stream one season at a time rather than building the whole file in memory
+        with open(json_path, 'rb') as f:
+            for season_name, season_data in ijson.kvitems(f, '', use_float=True):
+                for match_file, match_data in season_data.items():
+                    yield season_name, match_file, match_data
+        return
+    
+    with open(json_path, 'rb') as f:
+        data = orjson.loads(f.read())
+    for season_name, season_data in data.items():
+        for match_file, match_data in season_data.items():
+            yield season_name, match_file, match_data
+
+def setup_schema(conn):
+    """Create the stats tables if they don't exist and migrate older databases"""
     cursor = conn.cursor()
+    cursor.execute("BEGIN IMMEDIATE")
     
     # Create necessary tables if they don't exist
     cursor.execute('''
@@ -136,31 +319,29 @@ def process_sample_match(json_path, output_db_path, ref_db_path):
     )
     ''')
     
-    # Check if role column exists, add it if not
-    cursor.execute("PRAGMA table_info(player_stats)")
-    columns = [col[1] for col in cursor.fetchall()]
-    if 'role' not in columns:
-        print("Adding role column to player_stats table...")
-        cursor.execute("ALTER TABLE player_stats ADD COLUMN role TEXT")
-        conn.commit()
+    # Lets the match summary read a match's rows already in faction/score order
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_ps_match_faction_score ON player_stats(match_id, faction, score DESC)")
+    
+    # Databases created before the role column need it added; once checked,
+    # the schema version is stamped so later runs skip the probe
+    cursor.execute("PRAGMA user_version")
+    if cursor.fetchone()[0] < SCHEMA_VERSION:
+        cursor.execute("PRAGMA table_info(player_stats)")
+        columns = [col[1] for col in cursor.fetchall()]
+        if 'role' not in columns:
+            print("Adding role column to player_stats table...")
+            cursor.execute("ALTER TABLE player_stats ADD COLUMN role TEXT")
+        cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    
+    cursor.execute("COMMIT")
+
+def process_match(conn, role_cursor, role_cache, season_name, match_file, match_data):
+    """Ask for one match's details and roles, then write it in a single transaction"""
+    print(f"\nProcessing match: {match_file}")
+    print(f"Match result: {match_data.get('match_result', 'Unknown')}")
     
     # Extract match details
-    match_result = match_data.get("match_result", "UNKNOWN")
-    if "IMPERIAL" in match_result.upper() or "EMPIRE" in match_result.upper():
-        winner = "IMPERIAL"
-    elif "REBEL" in match_result.upper() or "NEW REPUBLIC" in match_result.upper() or "REPUBLIC" in match_result.upper():
-        winner = "REBEL"
-    else:
-        winner = "UNKNOWN"
-    
-    # Get or create season
-    cursor.execute("SELECT id FROM seasons WHERE name = ?", (season_name,))
-    result = cursor.fetchone()
-    if result:
-        season_id = result[0]
-    else:
-        cursor.execute("INSERT INTO seasons (name) VALUES (?)", (season_name,))
-        season_id = cursor.lastrowid
+    winner = _match_winner(match_data.get("match_result", "UNKNOWN"))
     
     # Get teams data
     teams_data = match_data.get("teams", {})
@@ -178,28 +359,28 @@ def process_sample_match(json_path, output_db_path, ref_db_path):
     else:
         rebel_players = rebel_data if isinstance(rebel_data, list) else []
     
+    # Fetch the primary roles of players not seen earlier in one query
+    prefetch_player_roles(role_cursor, [
+        name for name in (_player_name(player) for player in imperial_players + rebel_players)
+        if name not in role_cache
+    ], role_cache)
+    
     # Display players
     print("\nIMPERIAL players:")
     for player in imperial_players:
-        if isinstance(player, dict):
-            player_name = player.get("player", "Unknown")
-        else:
-            player_name = str(player)
+        player_name = _player_name(player)
         
         # Get primary role from reference db
-        primary_role = get_player_role(ref_db_path, player_name)
+        primary_role = get_player_role(role_cursor, player_name, role_cache)
         role_info = f" (Role: {primary_role})" if primary_role else ""
         print(f"  - {player_name}{role_info}")
     
     print("\nREBEL players:")
     for player in rebel_players:
-        if isinstance(player, dict):
-            player_name = player.get("player", "Unknown")
-        else:
-            player_name = str(player)
+        player_name = _player_name(player)
         
         # Get primary role from reference db
-        primary_role = get_player_role(ref_db_path, player_name)
+        primary_role = get_player_role(role_cursor, player_name, role_cache)
         role_info = f" (Role: {primary_role})" if primary_role else ""
         print(f"  - {player_name}{role_info}")
     
@@ -220,22 +401,24 @@ def process_sample_match(json_path, output_db_path, ref_db_path):
             rebel_team_name = "NR_ranked_team"
         print(f"\nAuto-assigned team names: {imperial_team_name} vs {rebel_team_name}")
     
+    # Collect every role decision before writing, so no write lock is held
+    # while waiting on input
+    imperial_roles = _choose_roles(role_cursor, imperial_players, role_cache)
+    rebel_roles = _choose_roles(role_cursor, rebel_players, role_cache)
+    
+    cursor = conn.cursor()
+    cursor.execute("BEGIN IMMEDIATE")
+    
+    # Get or create season
+    cursor.execute(SQL_UPSERT_SEASON, (season_name,))
+    season_id = cursor.fetchone()[0]
+    
     # Create teams
-    cursor.execute("SELECT id FROM teams WHERE name = ?", (imperial_team_name,))
-    result = cursor.fetchone()
-    if result:
-        imperial_team_id = result[0]
-    else:
-        cursor.execute("INSERT INTO teams (name) VALUES (?)", (imperial_team_name,))
-        imperial_team_id = cursor.lastrowid
+    cursor.execute(SQL_UPSERT_TEAM, (imperial_team_name,))
+    imperial_team_id = cursor.fetchone()[0]
     
-    cursor.execute("SELECT id FROM teams WHERE name = ?", (rebel_team_name,))
-    result = cursor.fetchone()
-    if result:
-        rebel_team_id = result[0]
-    else:
-        cursor.execute("INSERT INTO teams (name) VALUES (?)", (rebel_team_name,))
-        rebel_team_id = cursor.lastrowid
+    cursor.execute(SQL_UPSERT_TEAM, (rebel_team_name,))
+    rebel_team_id = cursor.fetchone()[0]
     
     # Create match record
     match_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -245,158 +428,18 @@ def process_sample_match(json_path, output_db_path, ref_db_path):
     """, (season_id, imperial_team_id, rebel_team_id, winner, match_file, match_date, match_type))
     match_id = cursor.lastrowid
     
-    # Process imperial players
-    for player in imperial_players:
-        if isinstance(player, dict):
-            player_name = player.get("player", "Unknown")
-            position = player.get("position", "")
-            score = player.get("score", 0)
-            kills = player.get("kills", 0)
-            deaths = player.get("deaths", 0)
-            assists = player.get("assists", 0)
-            ai_kills = player.get("ai_kills", 0)
-            cap_ship_damage = player.get("cap_ship_damage", 0)
-        else:
-            player_name = str(player)
-            position = ""
-            score = 0
-            kills = 0
-            deaths = 0
-            assists = 0
-            ai_kills = 0
-            cap_ship_damage = 0
-        
-        # Generate player hash
-        import hashlib
-        player_hash = player_name.encode('utf-8')
-        player_hash = hashlib.sha256(player_hash).hexdigest()[:16]
-        
-        # Get or create player
-        cursor.execute("SELECT id FROM players WHERE name = ?", (player_name,))
-        result = cursor.fetchone()
-        if result:
-            player_id = result[0]
-        else:
-            cursor.execute("INSERT INTO players (name, player_hash) VALUES (?, ?)", (player_name, player_hash))
-            player_id = cursor.lastrowid
-        
-        # Get primary role from reference db
-        primary_role = get_player_role(ref_db_path, player_name)
-        print(f"\nPlayer: {player_name} (Primary role: {primary_role or 'None'})")
-        
-        # Allow role override
-        valid_roles = ["Farmer", "Flex", "Support"]
-        role_options_str = ", ".join(valid_roles)
-        if primary_role:
-            role_prompt = f"Enter role for this match ({role_options_str}) or press Enter to keep primary role: "
-        else:
-            role_prompt = f"Enter role for this match ({role_options_str}) or press Enter for no role: "
-        
-        user_role = input(role_prompt).strip()
-        
-        if user_role:
-            # Normalize input (capitalize first letter only)
-            user_role = user_role[0].upper() + user_role[1:].lower()
-            if user_role in valid_roles:
-                player_role = user_role
-                print(f"Using role for this match: {player_role}")
-            else:
-                print(f"Invalid role '{user_role}'. Using primary role.")
-                player_role = primary_role
-        else:
-            player_role = primary_role
-        
-        # Set team_id based on match type
-        team_id_value = None if match_type in ['pickup', 'ranked'] else imperial_team_id
-        
-        # Insert player stats
-        cursor.execute("""
-        INSERT INTO player_stats (
-            match_id, player_id, player_name, player_hash, team_id, faction, position, role,
-            score, kills, deaths, assists, ai_kills, cap_ship_damage, is_subbing
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            match_id, player_id, player_name, player_hash, team_id_value, "IMPERIAL", position, player_role,
-            score, kills, deaths, assists, ai_kills, cap_ship_damage, 0
-        ))
+    # Stats rows for both factions, written in one batch
+    stats_rows = []
     
-    # Process rebel players (similar to imperial)
-    for player in rebel_players:
-        if isinstance(player, dict):
-            player_name = player.get("player", "Unknown")
-            position = player.get("position", "")
-            score = player.get("score", 0)
-            kills = player.get("kills", 0)
-            deaths = player.get("deaths", 0)
-            assists = player.get("assists", 0)
-            ai_kills = player.get("ai_kills", 0)
-            cap_ship_damage = player.get("cap_ship_damage", 0)
-        else:
-            player_name = str(player)
-            position = ""
-            score = 0
-            kills = 0
-            deaths = 0
-            assists = 0
-            ai_kills = 0
-            cap_ship_damage = 0
-        
-        # Generate player hash
-        import hashlib
-        player_hash = player_name.encode('utf-8')
-        player_hash = hashlib.sha256(player_hash).hexdigest()[:16]
-        
-        # Get or create player
-        cursor.execute("SELECT id FROM players WHERE name = ?", (player_name,))
-        result = cursor.fetchone()
-        if result:
-            player_id = result[0]
-        else:
-            cursor.execute("INSERT INTO players (name, player_hash) VALUES (?, ?)", (player_name, player_hash))
-            player_id = cursor.lastrowid
-        
-        # Get primary role from reference db
-        primary_role = get_player_role(ref_db_path, player_name)
-        print(f"\nPlayer: {player_name} (Primary role: {primary_role or 'None'})")
-        
-        # Allow role override
-        valid_roles = ["Farmer", "Flex", "Support"]
-        role_options_str = ", ".join(valid_roles)
-        if primary_role:
-            role_prompt = f"Enter role for this match ({role_options_str}) or press Enter to keep primary role: "
-        else:
-            role_prompt = f"Enter role for this match ({role_options_str}) or press Enter for no role: "
-        
-        user_role = input(role_prompt).strip()
-        
-        if user_role:
-            # Normalize input (capitalize first letter only)
-            user_role = user_role[0].upper() + user_role[1:].lower()
-            if user_role in valid_roles:
-                player_role = user_role
-                print(f"Using role for this match: {player_role}")
-            else:
-                print(f"Invalid role '{user_role}'. Using primary role.")
-                player_role = primary_role
-        else:
-            player_role = primary_role
-        
-        # Set team_id based on match type
-        team_id_value = None if match_type in ['pickup', 'ranked'] else rebel_team_id
-        
-        # Insert player stats
-        cursor.execute("""
-        INSERT INTO player_stats (
-            match_id, player_id, player_name, player_hash, team_id, faction, position, role,
-            score, kills, deaths, assists, ai_kills, cap_ship_damage, is_subbing
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            match_id, player_id, player_name, player_hash, team_id_value, "REBEL", position, player_role,
-            score, kills, deaths, assists, ai_kills, cap_ship_damage, 0
-        ))
+    # Process imperial players, then rebel players
+    _process_faction(cursor, imperial_players, imperial_roles, "IMPERIAL", imperial_team_id,
+                     match_id, match_type, stats_rows)
+    _process_faction(cursor, rebel_players, rebel_roles, "REBEL", rebel_team_id,
+                     match_id, match_type, stats_rows)
     
-    # Commit changes and close
-    conn.commit()
+    # Insert all player stats in one batch and commit the whole match
+    cursor.executemany(SQL_INSERT_PLAYER_STATS, stats_rows)
+    cursor.execute("COMMIT")
     
     # Generate report
     cursor.execute("""
@@ -421,13 +464,49 @@ def process_sample_match(json_path, output_db_path, ref_db_path):
     print(f"\n{'Player':25} {'Faction':10} {'Role':10} {'Score':6} {'K':3} {'D':3}")
     print("-" * 60)
     
-    for p in players:
-        role = p[2] if p[2] else "None"
-        print(f"{p[0]:<25} {p[1]:<10} {role:<10} {p[3]:<6} {p[4]:<3} {p[5]:<3}")
+    # Format every row first and write the table in one call
+    lines = [f"{p[0]:<25} {p[1]:<10} {(p[2] or 'None'):<10} {p[3]:<6} {p[4]:<3} {p[5]:<3}" for p in players]
+    if lines:
+        sys.stdout.write("\n".join(lines) + "\n")
+    
+    return match_id
+
+def main(json_path, output_db_path, ref_db_path):
+    """Process every match in a results file with role support"""
+    if not os.path.exists(json_path):
+        print(f"Error: JSON file not found: {json_path}")
+        return False
     
-    conn.close()
+    # Both databases stay open for the whole file: one reference connection
+    # and cursor serve every role lookup, and roles found for one match are
+    # reused for the rest
+    ref_conn = open_reference_db(ref_db_path)
+    role_cursor = ref_conn.cursor() if ref_conn is not None else None
+    role_cache = {}
+    
+    # Create the database if it doesn't exist. Transactions are managed
+    # explicitly so each match is written with a single commit.
+    conn = sqlite3.connect(output_db_path)
+    configure_connection(conn)
+    conn.isolation_level = None
+    
+    try:
+        setup_schema(conn)
+        
+        match_count = 0
+        for season_name, match_file, match_data in iter_matches(json_path):
+            process_match(conn, role_cursor, role_cache, season_name, match_file, match_data)
+            match_count += 1
+    finally:
+        conn.close()
+        if ref_conn is not None:
+            ref_conn.close()
+    
+    if match_count == 0:
+        print("Error: No data found in JSON file")
+        return False
     
-    print("\nMatch processed successfully with role support!")
+    print(f"\n{match_count} matches processed successfully with role support!")
     return True
 
 if __name__ == "__main__":
@@ -444,8 +523,8 @@ if __name__ == "__main__":
     if len(sys.argv) > 3:
         ref_db_path = sys.argv[3]
     
-    print(f"Processing sample match from: {json_path}")
+    print(f"Processing matches from: {json_path}")
     print(f"Output database: {output_db_path}")
     print(f"Reference database: {ref_db_path}")
     
-    process_sample_match(json_path, output_db_path, ref_db_path)
+    main(json_path, output_db_path, ref_db_path)
@@ -1,13 +1,19 @@
 import os
 import base64
 import json
+import orjson
+import re
+import hashlib
 import logging
-import mimetypes
 import azure.functions as func
 from io import BytesIO
-import requests
+from PIL import Image
 import time
+import random
+import threading
 import anthropic
+from pydantic import BaseModel, ValidationError
+from concurrent.futures import ThreadPoolExecutor
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -17,93 +23,250 @@ logger = logging.getLogger(__name__)
 ANTHROPIC_API_KEY = os.environ.get("ANTHROPIC_API_KEY")
 CLAUDE_MODEL = "claude-3-7-sonnet-20250219"
 MAX_RETRIES = 3
-RETRY_DELAY = 5  # Increased retry delay to 5 seconds
+RETRY_DELAY = 5  # Base retry delay in seconds, doubled after each failed attempt
+MAX_RETRY_DELAY = 60
+# Maximum number of images sent to Claude at the same time
+MAX_CONCURRENCY = int(os.environ.get("SCORE_CONCURRENCY", 8))
+# Threads reading and encoding images ahead of the API calls
+ENCODE_WORKERS = 2
+# Upper bound in seconds of the random delay before each batched API call
+LAUNCH_JITTER = 0.25
+# Longest edge in pixels of the images sent to Claude for each image detail level.
+# "low" is enough to read a cropped scoreboard at roughly half the image tokens
+IMAGE_DETAIL_EDGES = {"low": 1092, "high": 1568}
+IMAGE_DETAIL = os.environ.get("CLAUDE_IMAGE_DETAIL", "low").lower()
+MAX_IMAGE_EDGE = IMAGE_DETAIL_EDGES.get(IMAGE_DETAIL, IMAGE_DETAIL_EDGES["low"])
+# JPEG quality of the images sent to Claude
+JPEG_QUALITY = 85
+# Pixels at or below this brightness count as the black border around the scoreboard
+CROP_THRESHOLD = 20
+# Suffix of the compressed copies older versions cached next to the screenshots;
+# folder scans still skip any that are left over
+COMPRESSED_SUFFIX = ".compressed.jpg"
+# Folder, next to the screenshots, holding compressed images and results keyed by
+# image content and extraction settings
+RESULT_CACHE_DIR = ".cache"
+# Bump whenever image preparation or result validation changes, so cached entries are redone
+PIPELINE_VERSION = 1
+# Upper bound on the reply length; the scoreboard JSON is well under 1000 tokens
+CLAUDE_MAX_TOKENS = int(os.environ.get("CLAUDE_MAX_TOKENS", 1200))
+# Opening ```json or `json marker Claude puts before the JSON in its reply
+_JSON_BLOCK = re.compile(r'`{1,3}json')
+_JSON_DECODER = json.JSONDecoder()
 
-def get_mime_type(file_path):
-    """Determine the MIME type of a file based on its extension"""
-    # Make sure mimetypes is initialized
-    mimetypes.init()
-    
-    mime_type, _ = mimetypes.guess_type(file_path)
-    if mime_type and mime_type.startswith('image/'):
-        return mime_type
-    
-    # Default to JPEG if we can't determine the type
-    return 'image/jpeg'
+# Instructions sent with every screenshot, with the expected output format
+_PROMPT = """\
+Extract this Star Wars Squadrons score screen to a json. Pay close attention to the horizontal alignment such that the cap ship damage scores are attributed to the correct players and all the data from a row is kept together.  Also ensure that players are grouped by team even if not all 5 players are on a team.
 
-def extract_scores_from_image(image_path):
-    """
-    Process a game score screen image with Claude API and extract structured data.
-    
-    Args:
-        image_path (str): Path to the image file
-        
-    Returns:
-        dict: Extracted scores as JSON
-    """
-    # Initialize the Anthropic client
-    client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
+Please follow this exact format for the output:
+```json
+{
+  "match_result": "IMPERIAL VICTORY",
+  "teams": {
+    "imperial": {
+      "players": [
+        {
+          "position": "Titan Four",
+          "player": "playername1",
+          "score": 1675,
+          "kills": 0,
+          "deaths": 2,
+          "assists": 0,
+          "ai_kills": 18,
+          "cap_ship_damage": 30139
+        },
+        ...
+      ]
+    },
+    "rebel": {
+      "players": [
+        {
+          "position": "Vanguard Three",
+          "player": "playername2",
+          "score": 555,
+          "kills": 0,
+          "deaths": 1,
+          "assists": 0,
+          "ai_kills": 35,
+          "cap_ship_damage": 0
+        },
+        ...
+      ]
+    }
+  }
+}
+```
+
+Return only the JSON with no additional text.
+"""
+
+# Everything besides the image that decides what Claude is sent and returns; hashed into every cache key
+_CACHE_SETTINGS = orjson.dumps([
+    PIPELINE_VERSION, CLAUDE_MODEL, MAX_IMAGE_EDGE, JPEG_QUALITY, CROP_THRESHOLD, CLAUDE_MAX_TOKENS, _PROMPT
+])
+
+class PlayerScore(BaseModel):
+    """One player's row on the score screen"""
+    position: str
+    player: str
+    score: int
+    kills: int
+    deaths: int
+    assists: int
+    ai_kills: int
+    cap_ship_damage: int
+
+class TeamScores(BaseModel):
+    """The players listed for one faction"""
+    players: list[PlayerScore]
+
+class MatchResult(BaseModel):
+    """The JSON Claude is asked to return for a score screen"""
+    match_result: str
+    teams: dict[str, TeamScores]
+
+# Shared Anthropic client, created on first use so its connection pool is reused
+_CLIENT = None
+_CLIENT_LOCK = threading.Lock()
+
+def _get_client():
+    """Return the shared Anthropic client, creating it on first use"""
+    global _CLIENT
+    if _CLIENT is None:
+        with _CLIENT_LOCK:
+            if _CLIENT is None:
+                # Retries are handled in _call_claude
+                _CLIENT = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY, max_retries=0)
+    return _CLIENT
+
+def _crop_to_content(img):
+    """Crop an image to the bounding box of its non-black pixels"""
+    # The scoreboard sits in a band surrounded by near-black space that would
+    # otherwise cost tokens and lower the effective resolution after downscaling
+    mask = img.convert("L").point(lambda v: 255 if v > CROP_THRESHOLD else 0)
+    bbox = mask.getbbox()
+    if bbox and bbox != (0, 0) + img.size:
+        return img.crop(bbox)
+    return img
+
+def _compress_image(fp):
+    """Downscale an image file or stream to MAX_IMAGE_EDGE and re-encode it as JPEG"""
+    # Pillow decodes straight from fp, so the original file is never held in memory as a whole
+    with Image.open(fp) as img:
+        # No reduced-scale JPEG draft decode here: the scale would be picked from
+        # the whole frame and could leave the cropped scoreboard below MAX_IMAGE_EDGE
+        img = _crop_to_content(img)
+        img.thumbnail((MAX_IMAGE_EDGE, MAX_IMAGE_EDGE), Image.LANCZOS)
+        buf = BytesIO()
+        img.convert("RGB").save(buf, "JPEG", quality=JPEG_QUALITY, optimize=True)
+    return buf.getvalue()
+
+def compress_image_bytes(image_data):
+    """Downscale an image to MAX_IMAGE_EDGE and re-encode it as JPEG"""
+    return _compress_image(BytesIO(image_data))
+
+def _write_cache_file(cache_path, data):
+    """Store bytes in the cache, logging rather than raising if it can't be written"""
+    # Write to a temporary file first so a crash never leaves a partial entry
+    temp_path = f"{cache_path}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(temp_path, "wb") as cache_file:
+            cache_file.write(data)
+        os.replace(temp_path, cache_path)
+    except OSError as e:
+        logger.warning(f"Could not write cache file {cache_path}: {e}")
+
+def _load_compressed_image(image_path, cache_path=None):
+    """Return the compressed JPEG bytes for an image, reusing the cached copy at cache_path if there is one"""
+    if cache_path:
+        try:
+            with open(cache_path, "rb") as cache_file:
+                return cache_file.read()
+        except OSError:
+            pass
     
-    # Read and encode the image
+    image_data = _compress_image(image_path)
+    if cache_path:
+        _write_cache_file(cache_path, image_data)
+    return image_data
+
+def _jpeg_source(jpeg_data):
+    """Build the base64 image source block for compressed JPEG bytes"""
+    return {
+        "type": "base64",
+        "media_type": "image/jpeg",
+        "data": base64.b64encode(jpeg_data).decode("ascii")
+    }
+
+def _prepare_payload(image_path, compressed_path=None):
+    """Compress and base64 encode an image, returning the image source block for the API"""
+    # Read, compress and encode the image
     try:
-        with open(image_path, "rb") as image_file:
-            image_data = image_file.read()
-            base64_image = base64.b64encode(image_data).decode("utf-8")
+        image_source = _jpeg_source(_load_compressed_image(image_path, compressed_path))
     except Exception as e:
         logger.error(f"Failed to read image file: {e}")
         raise ValueError(f"Could not process image at {image_path}: {str(e)}")
     
-    # Get the MIME type for the image
-    mime_type = get_mime_type(image_path)
-    logger.info(f"Using MIME type: {mime_type} for image: {image_path}")
-    
-    # Create the prompt with the image and expected output format
-    prompt = """
-    Extract this Star Wars Squadrons score screen to a json. Pay close attention to the horizontal alignment such that the cap ship damage scores are attributed to the correct players and all the data from a row is kept together.  Also ensure that players are grouped by team even if not all 5 players are on a team.
-    
-    Please follow this exact format for the output:
-    ```json
-    {
-      "match_result": "IMPERIAL VICTORY",
-      "teams": {
-        "imperial": {
-          "players": [
-            {
-              "position": "Titan Four",
-              "player": "playername1",
-              "score": 1675,
-              "kills": 0,
-              "deaths": 2,
-              "assists": 0,
-              "ai_kills": 18,
-              "cap_ship_damage": 30139
-            },
-            ...
-          ]
-        },
-        "rebel": {
-          "players": [
-            {
-              "position": "Vanguard Three",
-              "player": "playername2",
-              "score": 555,
-              "kills": 0,
-              "deaths": 1,
-              "assists": 0,
-              "ai_kills": 35,
-              "cap_ship_damage": 0
-            },
-            ...
-          ]
-        }
-      }
-    }
-    ```
-    
-    Return only the JSON with no additional text.
-    """
-    
-    # Call the Claude API with retries
+    # Compressed images are always sent as JPEG
+    logger.info(f"Using MIME type: image/jpeg for image: {image_path}")
+    return image_source
+
+def _parse_claude_json(text):
+    """Parse the first JSON object in Claude's reply, after a json code fence if there is one"""
+    block = _JSON_BLOCK.search(text)
+    json_start = text.find("{", block.end() if block else 0)
+    if json_start < 0:
+        raise ValueError("Could not find JSON in Claude's response")
+    extracted_data, _ = _JSON_DECODER.raw_decode(text, json_start)
+    return extracted_data
+
+def _cache_paths(image_path):
+    """Paths of the cached (result, compressed image) for an image, or (None, None) if it can't be read"""
+    digest = hashlib.sha256(_CACHE_SETTINGS)
+    try:
+        with open(image_path, "rb") as image_file:
+            for chunk in iter(lambda: image_file.read(1 << 20), b""):
+                digest.update(chunk)
+    except OSError:
+        return None, None
+    cache_base = os.path.join(os.path.dirname(image_path), RESULT_CACHE_DIR, digest.hexdigest())
+    return f"{cache_base}.json", f"{cache_base}.jpg"
+
+def _prepare_cached(image_path):
+    """Return (cache_path, cached_result, image_source), encoding the image only on a cache miss"""
+    cache_path, compressed_path = _cache_paths(image_path)
+    if cache_path:
+        try:
+            with open(cache_path, "rb") as cache_file:
+                logger.info(f"Using cached result for image: {image_path}")
+                return cache_path, orjson.loads(cache_file.read()), None
+        except (OSError, orjson.JSONDecodeError):
+            pass
+    return cache_path, None, _prepare_payload(image_path, compressed_path)
+
+def _extract_and_cache(cache_path, image_source):
+    """Call Claude for an image and store the result in the cache"""
+    result = _call_claude(image_source)
+    if cache_path:
+        _write_cache_file(cache_path, orjson.dumps(result))
+    return result
+
+def _retry_delay(attempt, error):
+    """Seconds to wait before retrying a failed API call"""
+    # Rate limit responses say how long to back off for
+    if isinstance(error, anthropic.RateLimitError):
+        retry_after = error.response.headers.get("retry-after")
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+    # Otherwise back off exponentially, with jitter so concurrent calls don't retry in lockstep
+    return min(MAX_RETRY_DELAY, RETRY_DELAY * (2 ** attempt)) + random.random() * 2
+
+def _create_message(client, messages):
+    """Send a conversation to Claude, retrying API errors, and return the reply text"""
     for attempt in range(MAX_RETRIES):
         try:
             logger.info(f"Making API request attempt {attempt+1}/{MAX_RETRIES}")
@@ -111,78 +274,122 @@ def extract_scores_from_image(image_path):
             # Use the Anthropic client method
             message = client.messages.create(
                 model=CLAUDE_MODEL,
-                max_tokens=4000,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "image",
-                                "source": {
-                                    "type": "base64",
-                                    "media_type": mime_type,
-                                    "data": base64_image
-                                }
-                            },
-                            {"type": "text", "text": prompt}
-                        ]
-                    }
-                ]
+                max_tokens=CLAUDE_MAX_TOKENS,
+                messages=messages
             )
             
             # Get the response text
-            claude_response = message.content[0].text
             logger.info("API request successful")
-            
-            # Extract JSON from the response
-            try:
-                # Look for JSON content between ```json and ``` markers (standard for Claude)
-                if "```json" in claude_response:
-                    logger.info("Found JSON with ```json format")
-                    json_start = claude_response.find("```json") + 7
-                    json_end = claude_response.find("```", json_start)
-                    json_str = claude_response[json_start:json_end].strip()
-                # Also look for `json backtick format
-                elif "`json" in claude_response:
-                    logger.info("Found JSON with `json format")
-                    json_start = claude_response.find("`json") + 5
-                    json_end = claude_response.find("`", json_start)
-                    json_str = claude_response[json_start:json_end].strip()
-                # Or try to find just a raw JSON object
-                elif claude_response.strip().startswith("{") and claude_response.strip().endswith("}"):
-                    logger.info("Found raw JSON object")
-                    json_str = claude_response.strip()
-                else:
-                    # As a fallback, try to find any JSON-like structure
-                    logger.info("Attempting to extract JSON-like structure")
-                    json_start = claude_response.find("{")
-                    json_end = claude_response.rfind("}") + 1
-                    if json_start >= 0 and json_end > json_start:
-                        json_str = claude_response[json_start:json_end]
-                    else:
-                        logger.error("Could not find JSON in Claude's response")
-                        raise ValueError("Could not find JSON in Claude's response")
-                
-                logger.info("Parsing extracted JSON")
-                # Parse the extracted JSON
-                extracted_data = json.loads(json_str)
-                return extracted_data
-            
-            except (json.JSONDecodeError, ValueError) as e:
-                logger.error(f"Failed to parse JSON from Claude response: {e}")
-                logger.debug(f"Claude response: {claude_response}")
-                raise ValueError(f"Could not extract valid JSON from Claude's response: {str(e)}")
+            return message.content[0].text
         
         except anthropic.APIError as e:
             logger.warning(f"API request failed (attempt {attempt+1}/{MAX_RETRIES}): {e}")
             
             if attempt < MAX_RETRIES - 1:
-                logger.info(f"Waiting {RETRY_DELAY} seconds before retrying...")
-                time.sleep(RETRY_DELAY)
+                delay = _retry_delay(attempt, e)
+                logger.info(f"Waiting {delay:.1f} seconds before retrying...")
+                time.sleep(delay)
             else:
                 logger.error(f"All API request attempts failed")
                 raise RuntimeError(f"Failed to get response from Claude API: {str(e)}")
 
+def _call_claude(image_source):
+    """Send an image source block to Claude and return the extracted JSON"""
+    client = _get_client()
+    messages = [
+        {
+            "role": "user",
+            "content": [
+                {
+                    "type": "image",
+                    "source": image_source
+                },
+                {"type": "text", "text": _PROMPT}
+            ]
+        }
+    ]
+    
+    # Ask once more, with the validation errors, if the first reply has the wrong shape
+    for correction in range(2):
+        claude_response = _create_message(client, messages)
+        
+        # Extract JSON from the response
+        try:
+            logger.info("Parsing extracted JSON")
+            extracted_data = _parse_claude_json(claude_response)
+        except (json.JSONDecodeError, ValueError) as e:
+            logger.error(f"Failed to parse JSON from Claude response: {e}")
+            logger.debug(f"Claude response: {claude_response}")
+            raise ValueError(f"Could not extract valid JSON from Claude's response: {str(e)}")
+        
+        try:
+            MatchResult.model_validate(extracted_data)
+            return extracted_data
+        except ValidationError as e:
+            problems = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+            logger.warning(f"Claude response failed validation: {problems}")
+            if correction:
+                raise ValueError(f"Claude's response does not match the expected format: {problems}")
+            messages = messages + [
+                {"role": "assistant", "content": claude_response},
+                {"role": "user", "content": f"Previous output failed validation: {problems}. Return corrected JSON only."}
+            ]
+
+def extract_scores_from_image(image_path):
+    """
+    Process a game score screen image with Claude API and extract structured data.
+    
+    Args:
+        image_path (str): Path to the image file
+        
+    Returns:
+        dict: Extracted scores as JSON
+    """
+    cache_path, cached_result, image_source = _prepare_cached(image_path)
+    if cached_result is not None:
+        return cached_result
+    return _extract_and_cache(cache_path, image_source)
+
+def extract_scores_from_bytes(image_bytes):
+    """
+    Process a game score screen image held in memory with Claude API.
+    
+    Args:
+        image_bytes (bytes): Raw image file contents
+        
+    Returns:
+        dict: Extracted scores as JSON
+    """
+    return _call_claude(_jpeg_source(compress_image_bytes(image_bytes)))
+
+def extract_scores_from_url(image_url):
+    """
+    Process a game score screen image hosted at a URL with Claude API.
+    
+    Claude fetches the image itself, so nothing is downloaded or encoded here.
+    
+    Args:
+        image_url (str): Public URL of the image
+        
+    Returns:
+        dict: Extracted scores as JSON
+    """
+    logger.info(f"Using image URL: {image_url}")
+    return _call_claude({"type": "url", "url": image_url})
+
+def _call_claude_staggered(payload_future, in_flight):
+    """Wait for an image's encoded payload, then call Claude after a short random delay"""
+    try:
+        cache_path, cached_result, image_source = payload_future.result()
+        if cached_result is not None:
+            return cached_result
+        # Spread the calls out so the slots don't all send and wait in lockstep
+        time.sleep(random.uniform(0, LAUNCH_JITTER))
+        return _extract_and_cache(cache_path, image_source)
+    finally:
+        # The payload is done with, so another image may be encoded
+        in_flight.release()
+
 def extract_scores_from_multiple_images(image_paths):
     """
     Process multiple game score screen images with Claude API and extract structured data.
@@ -195,18 +402,29 @@ def extract_scores_from_multiple_images(image_paths):
     """
     results = {}
     
-    for image_path in image_paths:
-        try:
+    # Each call spends almost all of its time waiting on the API, so run up to
+    # MAX_CONCURRENCY of them at once and collect the results in input order.
+    # A separate pool reads and encodes images ahead, so payloads are ready by
+    # the time an API slot frees up, but only a bounded amount ahead so the
+    # encoded payloads of a large folder are never all in memory at once.
+    in_flight = threading.BoundedSemaphore(MAX_CONCURRENCY + ENCODE_WORKERS)
+    with ThreadPoolExecutor(max_workers=ENCODE_WORKERS) as encoder, \
+            ThreadPoolExecutor(max_workers=MAX_CONCURRENCY) as executor:
+        futures = []
+        for image_path in image_paths:
+            logger.info(f"Processing image: {os.path.basename(image_path)}")
+            in_flight.acquire()
+            payload_future = encoder.submit(_prepare_cached, image_path)
+            futures.append((image_path, executor.submit(_call_claude_staggered, payload_future, in_flight)))
+        
+        for image_path, future in futures:
             filename = os.path.basename(image_path)
-            logger.info(f"Processing image: {filename}")
-            
-            result = extract_scores_from_image(image_path)
-            results[filename] = result
-            
-            logger.info(f"Successfully processed {filename}")
-        except Exception as e:
-            logger.error(f"Error processing {image_path}: {str(e)}")
-            results[os.path.basename(image_path)] = {"error": str(e)}
+            try:
+                results[filename] = future.result()
+                logger.info(f"Successfully processed {filename}")
+            except Exception as e:
+                logger.error(f"Error processing {image_path}: {str(e)}")
+                results[filename] = {"error": str(e)}
     
     return results
 
@@ -218,7 +436,7 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
         req_body = req.get_json()
     except ValueError:
         return func.HttpResponse(
-            json.dumps({"error": "Request must contain valid JSON"}),
+            orjson.dumps({"error": "Request must contain valid JSON"}),
             status_code=400,
             mimetype="application/json"
         )
@@ -226,30 +444,19 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
     # If it's a direct API call with base64 image
     if "image_base64" in req_body:
         try:
-            # Decode base64 string to image
+            # Decode base64 string to image and process it in memory
             image_data = base64.b64decode(req_body["image_base64"])
+            result = extract_scores_from_bytes(image_data)
             
-            # Save to temp file
-            temp_image_path = "/tmp/temp_image.jpg"
-            with open(temp_image_path, "wb") as temp_file:
-                temp_file.write(image_data)
-            
-            # Process the image
-            result = extract_scores_from_image(temp_image_path)
-            
-            # Clean up
-            if os.path.exists(temp_image_path):
-                os.remove(temp_image_path)
-                
             return func.HttpResponse(
-                json.dumps(result),
+                orjson.dumps(result),
                 status_code=200,
                 mimetype="application/json"
             )
         except Exception as e:
             logging.error(f"Error processing base64 image: {str(e)}")
             return func.HttpResponse(
-                json.dumps({"error": str(e)}),
+                orjson.dumps({"error": str(e)}),
                 status_code=500,
                 mimetype="application/json"
             )
@@ -265,31 +472,22 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
                 # Decode base64 string to image
                 image_data = base64.b64decode(img_data)
                 
-                # Save to temp file
-                temp_image_path = f"/tmp/temp_image_{idx}.jpg"
-                with open(temp_image_path, "wb") as temp_file:
-                    temp_file.write(image_data)
-                
-                # Process the image
+                # Process the image in memory
                 try:
-                    img_result = extract_scores_from_image(temp_image_path)
+                    img_result = extract_scores_from_bytes(image_data)
                     results[img_name] = img_result
                 except Exception as e:
                     results[img_name] = {"error": str(e)}
-                
-                # Clean up
-                if os.path.exists(temp_image_path):
-                    os.remove(temp_image_path)
             
             return func.HttpResponse(
-                json.dumps(results),
+                orjson.dumps(results),
                 status_code=200,
                 mimetype="application/json"
             )
         except Exception as e:
             logging.error(f"Error processing multiple base64 images: {str(e)}")
             return func.HttpResponse(
-                json.dumps({"error": str(e)}),
+                orjson.dumps({"error": str(e)}),
                 status_code=500,
                 mimetype="application/json"
             )
@@ -297,38 +495,18 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
     # If it's a URL to an image
     elif "image_url" in req_body:
         try:
-            # Download the image
-            response = requests.get(req_body["image_url"])
-            response.raise_for_status()
-            
-            # Save to temp file with correct extension based on content type
-            content_type = response.headers.get('Content-Type', 'image/jpeg')
-            extension = '.jpg'
-            if 'png' in content_type:
-                extension = '.png'
-            elif 'gif' in content_type:
-                extension = '.gif'
-                
-            temp_image_path = f"/tmp/temp_image{extension}"
-            with open(temp_image_path, "wb") as temp_file:
-                temp_file.write(response.content)
+            # Claude fetches the image from the URL directly
+            result = extract_scores_from_url(req_body["image_url"])
             
-            # Process the image
-            result = extract_scores_from_image(temp_image_path)
-            
-            # Clean up
-            if os.path.exists(temp_image_path):
-                os.remove(temp_image_path)
-                
             return func.HttpResponse(
-                json.dumps(result),
+                orjson.dumps(result),
                 status_code=200,
                 mimetype="application/json"
             )
         except Exception as e:
             logging.error(f"Error processing image URL: {str(e)}")
             return func.HttpResponse(
-                json.dumps({"error": str(e)}),
+                orjson.dumps({"error": str(e)}),
                 status_code=500,
                 mimetype="application/json"
             )
@@ -337,54 +515,37 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
     elif "image_urls" in req_body:
         try:
             results = {}
-            for idx, url in enumerate(req_body["image_urls"]):
-                # Get image name if provided, otherwise use URL or index
-                img_name = req_body.get("image_names", {}).get(str(idx), os.path.basename(url) or f"image_{idx}")
+            # Claude fetches each image from its URL directly, so the calls
+            # only wait on the API and can all run at once
+            with ThreadPoolExecutor(max_workers=MAX_CONCURRENCY) as executor:
+                futures = []
+                for idx, url in enumerate(req_body["image_urls"]):
+                    # Get image name if provided, otherwise use URL or index
+                    img_name = req_body.get("image_names", {}).get(str(idx), os.path.basename(url) or f"image_{idx}")
+                    futures.append((img_name, executor.submit(extract_scores_from_url, url)))
                 
-                try:
-                    # Download the image
-                    response = requests.get(url)
-                    response.raise_for_status()
-                    
-                    # Save to temp file with correct extension based on content type
-                    content_type = response.headers.get('Content-Type', 'image/jpeg')
-                    extension = '.jpg'
-                    if 'png' in content_type:
-                        extension = '.png'
-                    elif 'gif' in content_type:
-                        extension = '.gif'
-                    
-                    temp_image_path = f"/tmp/temp_image_{idx}{extension}"
-                    with open(temp_image_path, "wb") as temp_file:
-                        temp_file.write(response.content)
-                    
-                    # Process the image
-                    img_result = extract_scores_from_image(temp_image_path)
-                    results[img_name] = img_result
-                    
-                    # Clean up
-                    if os.path.exists(temp_image_path):
-                        os.remove(temp_image_path)
-                
-                except Exception as e:
-                    results[img_name] = {"error": str(e)}
+                for img_name, future in futures:
+                    try:
+                        results[img_name] = future.result()
+                    except Exception as e:
+                        results[img_name] = {"error": str(e)}
             
             return func.HttpResponse(
-                json.dumps(results),
+                orjson.dumps(results),
                 status_code=200,
                 mimetype="application/json"
             )
         except Exception as e:
             logging.error(f"Error processing multiple image URLs: {str(e)}")
             return func.HttpResponse(
-                json.dumps({"error": str(e)}),
+                orjson.dumps({"error": str(e)}),
                 status_code=500,
                 mimetype="application/json"
             )
     
     else:
         return func.HttpResponse(
-            json.dumps({"error": "Request must contain either 'image_base64', 'images_base64', 'image_url', or 'image_urls'"}),
+            orjson.dumps({"error": "Request must contain either 'image_base64', 'images_base64', 'image_url', or 'image_urls'"}),
             status_code=400,
             mimetype="application/json"
         )
@@ -1,70 +1,144 @@
 import os
+import re
 import sys
-import json
+import orjson
 import time
 import argparse
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
 
 # Import the extract_scores_from_image function from your existing module
 # from score_extractor.test_extraction import extract_scores_from_image # Incorrect: Causes circular import
-from score_extractor import extract_scores_from_image # Correct: Import from the main package (__init__.py)
+from score_extractor import extract_scores_from_image, MAX_CONCURRENCY, COMPRESSED_SUFFIX # Correct: Import from the main package (__init__.py)
 
 # Load environment variables from .env file
 load_dotenv()
 
-def extract_scores_from_multiple_images(image_paths):
+# One pool for the Claude calls of every season, so MAX_CONCURRENCY is a global budget
+_API_POOL = ThreadPoolExecutor(max_workers=MAX_CONCURRENCY)
+
+# Screenshot file extensions, without the dot and in lowercase
+IMAGE_EXTENSIONS = frozenset({'jpg', 'jpeg', 'png'})
+
+# Filename date patterns, compiled once since they run for every screenshot
+# Star Wars Squadrons Screenshot YYYY.MM.DD - HH.MM.SS (allow optional fractional seconds)
+_SW = re.compile(
+    r'Star Wars\s+Squadrons\s+Screenshot\s+'
+    r'(\d{4})\.(\d{2})\.(\d{2})'
+    r'\s+-\s+'
+    r'(\d{2})\.(\d{2})\.(\d{2})(?:\.\d+)?',
+    re.IGNORECASE
+)
+_DATE_YMD = re.compile(r'(20\d{2})[.-](\d{2})[.-](\d{2})')
+_DATE_DMY = re.compile(r'(\d{2})[.-](\d{2})[.-](20\d{2})')
+# Optional HH.MM.SS directly after a date
+_TIME = re.compile(r'[_ ]?(\d{2})\.(\d{2})\.(\d{2})')
+
+def set_api_concurrency(max_workers):
+    """Replace the shared API pool with one that runs up to max_workers Claude calls at once"""
+    global _API_POOL
+    old_pool = _API_POOL
+    _API_POOL = ThreadPoolExecutor(max_workers=max_workers)
+    # Calls already queued on the old pool still finish
+    old_pool.shutdown(wait=False)
+
+def _submit_extractions(image_paths, results):
     """
-    Process multiple game score screen images and extract structured data.
+    Queue the Claude call for each image on the shared pool.
+    
+    The filename dates are read in this thread since extracting one may prompt
+    for input. Images that fail before their call is queued are recorded in
+    results straight away.
     
-    Args:
-        image_paths (list): List of paths to image files
-        
     Returns:
-        dict: Extracted scores for each image as JSON, keyed by filename
+        dict: (image_path, match_date) for each queued future
     """
-    results = {}
-    
+    futures = {}
     for image_path in image_paths:
+        filename = os.path.basename(image_path)
+        print(f"Processing image: {filename}")
         try:
-            filename = os.path.basename(image_path)
-            print(f"Processing image: {filename}")
-            
             # Try to extract date from filename
             match_date = extract_date_from_filename(filename)
             if match_date:
                 print(f"Extracted date from filename: {match_date}")
             
-            result = extract_scores_from_image(image_path)
-            
-            # Add the date to the result if found
-            if match_date:
-                result['match_date'] = match_date
-                
-            results[filename] = result
-            
-            print(f"Successfully processed {filename}")
+            futures[_API_POOL.submit(extract_scores_from_image, image_path)] = (image_path, match_date)
         except Exception as e:
             print(f"Error processing {image_path}: {str(e)}")
-            results[os.path.basename(image_path)] = {"error": str(e)}
+            results[filename] = {"error": str(e)}
+    return futures
+
+def _collect_extraction(future, image_path, match_date):
+    """Wait for an image's Claude call and return (filename, result), with the date added"""
+    filename = os.path.basename(image_path)
+    try:
+        result = future.result()
+        
+        # Add the date to the result if found
+        if match_date:
+            result['match_date'] = match_date
+        
+        print(f"Successfully processed {filename}")
+        return filename, result
+    except Exception as e:
+        print(f"Error processing {image_path}: {str(e)}")
+        return filename, {"error": str(e)}
+
+def extract_scores_from_multiple_images(image_paths):
+    """
+    Process multiple game score screen images and extract structured data.
+    
+    Args:
+        image_paths (list): List of paths to image files
+        
+    Returns:
+        dict: Extracted scores for each image as JSON, keyed by filename
+    """
+    results = {}
+    futures = _submit_extractions(image_paths, results)
+    
+    # Collect in input order so the saved results follow the folder listing
+    for future, (image_path, match_date) in futures.items():
+        filename, result = _collect_extraction(future, image_path, match_date)
+        results[filename] = result
     
     return results
 
+def iter_scores_from_images(image_paths):
+    """
+    Process multiple game score screen images, yielding each result as soon as it is ready.
+    
+    Unlike extract_scores_from_multiple_images, a slow image doesn't hold back
+    the results of the images queued after it.
+    
+    Args:
+        image_paths (list): List of paths to image files
+        
+    Yields:
+        tuple: (filename, extracted scores as JSON) in completion order
+    """
+    failed = {}
+    futures = _submit_extractions(image_paths, failed)
+    yield from failed.items()
+    
+    for future in as_completed(futures):
+        yield _collect_extraction(future, *futures[future])
+
 def extract_date_from_filename(filename):
     """
     Extract a date from a filename using specific patterns.
-    The function will only accept a date in the format YYYY-MM-DD HH:MM:SS.
+    Dates may be written YYYY.MM.DD or DD.MM.YYYY (with . or - separators), optionally followed by HH.MM.SS.
     If no valid date is found, it prompts the user to enter a date (in YYYY-MM-DD format).
     If the user presses Enter (or enters an invalid date), the current date is used (with time set to 00:00:00).
-
+    
     Args:
         filename (str): The filename to parse.
         
     Returns:
         str: The extracted or fallback date in "YYYY-MM-DD HH:MM:SS" format.
     """
-    import re
-    from datetime import datetime
-
     # Helper to validate a full date-time string.
     def validate_date(date_str):
         try:
@@ -72,35 +146,35 @@ def extract_date_from_filename(filename):
             return True
         except ValueError:
             return False
-
-    # Pattern: Star Wars Squadrons Screenshot YYYY.MM.DD - HH.MM.SS (allow optional fractional seconds)
-    sw_match = re.search(
-        r'Star Wars\s+Squadrons\s+Screenshot\s+'
-        r'(\d{4})\.(\d{2})\.(\d{2})'
-        r'\s+-\s+'
-        r'(\d{2})\.(\d{2})\.(\d{2})(?:\.\d+)?',
-        filename,
-        re.IGNORECASE
-    )
+    
+    # Pattern: Star Wars Squadrons Screenshot YYYY.MM.DD - HH.MM.SS
+    sw_match = _SW.search(filename)
     if sw_match:
         year, month, day, hour, minute, second = sw_match.groups()[:6]
         date_str = f"{year}-{month}-{day} {hour}:{minute}:{second}"
         if validate_date(date_str):
             return date_str
-
-    # Pattern: YYYY[.-]MM[.-]DD with optional time (if missing, default to noon)
-    match = re.search(r'(20\d{2})[.-](\d{2})[.-](\d{2})(?:[_ ]?(\d{2})\.(\d{2})\.(\d{2}))?', filename)
-    if match:
-        year, month, day, hour, minute, second = match.groups()
-        if hour and minute and second:
+    
+    # Patterns: YYYY[.-]MM[.-]DD, then DD[.-]MM[.-]YYYY, with optional time (if missing, default to noon)
+    for pattern in (_DATE_YMD, _DATE_DMY):
+        match = pattern.search(filename)
+        if not match:
+            continue
+        if pattern is _DATE_YMD:
+            year, month, day = match.groups()
+        else:
+            day, month, year = match.groups()
+        time_match = _TIME.match(filename, match.end())
+        if time_match:
+            hour, minute, second = time_match.groups()
             date_str = f"{year}-{month}-{day} {hour}:{minute}:{second}"
         else:
             date_str = f"{year}-{month}-{day} 12:00:00"
         if validate_date(date_str):
             return date_str
-
+    
     # If no valid date detected, prompt the user.
-    user_input = input("Could not extract a valid date from filename. Please enter date (YYYY-MM-DD) or press Enter to use the current date: ")
+    user_input = input(f"Could not extract a valid date from {filename}. Please enter date (YYYY-MM-DD) or press Enter to use the current date: ")
     if user_input.strip():
         try:
             # Parse the user input (expecting YYYY-MM-DD) and default time to 00:00:00.
@@ -126,14 +200,18 @@ def process_season_folder(season_folder, batch_size=None, output_dir=None):
     print(f"Processing season: {season_name}")
     print(f"{'='*50}")
     
-    supported_extensions = ['.jpg', '.jpeg', '.png']
     image_paths = []
     
-    # Find all image files in the folder
-    for filename in os.listdir(season_folder):
-        if any(filename.lower().endswith(ext) for ext in supported_extensions):
-            file_path = os.path.join(season_folder, filename)
-            image_paths.append(file_path)
+    # Find all image files in the folder, skipping our own compressed copies.
+    # scandir entries carry their file type, so no extra stat per file is needed
+    with os.scandir(season_folder) as entries:
+        for entry in entries:
+            if entry.name.rpartition('.')[2].lower() not in IMAGE_EXTENSIONS:
+                continue
+            if entry.name.lower().endswith(COMPRESSED_SUFFIX):
+                continue
+            if entry.is_file():
+                image_paths.append(entry.path)
     
     if not image_paths:
         print(f"No images found in {season_folder}")
@@ -154,8 +232,8 @@ def process_season_folder(season_folder, batch_size=None, output_dir=None):
             batch_results = extract_scores_from_multiple_images(batch)
             season_results.update(batch_results)
             
-            # Save intermediate results
-            save_season_results(season_folder, season_name, season_results, output_dir)
+            # Record this batch's results so progress survives an interrupted run
+            append_season_results(season_folder, season_name, batch_results, output_dir, start=(i == 0))
             
             # Small delay between batches to avoid API rate limits
             if i + batch_size < len(image_paths):
@@ -164,30 +242,54 @@ def process_season_folder(season_folder, batch_size=None, output_dir=None):
     else:
         # Process all images at once
         season_results = extract_scores_from_multiple_images(image_paths)
-        save_season_results(season_folder, season_name, season_results, output_dir)
+    
+    save_season_results(season_folder, season_name, season_results, output_dir)
     
     return {season_name: season_results}
 
-def save_season_results(folder_path, season_name, results, output_dir=None):
-    """Save the results for a season to a JSON file"""
+def season_results_path(folder_path, season_name, output_dir=None, extension=".json"):
+    """Return the path of a season's results file, creating its output folder if needed"""
     # Determine output path - either in output_dir or in the season folder
     if output_dir:
-        # Make sure the output directory exists
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
-            
         # Create a season subdirectory within the output directory
         season_output_dir = os.path.join(output_dir, season_name)
-        if not os.path.exists(season_output_dir):
-            os.makedirs(season_output_dir)
-            
-        output_path = os.path.join(season_output_dir, f"{season_name}_results.json")
-    else:
-        # Save in the original season folder
-        output_path = os.path.join(folder_path, f"{season_name}_results.json")
+        os.makedirs(season_output_dir, exist_ok=True)
+        return os.path.join(season_output_dir, f"{season_name}_results{extension}")
+    
+    # Save in the original season folder
+    return os.path.join(folder_path, f"{season_name}_results{extension}")
+
+def append_season_results(folder_path, season_name, results, output_dir=None, start=False):
+    """
+    Append results for a season to its JSON Lines progress file, one image per line.
+    
+    Only the new results are written, so saving after every batch costs time
+    proportional to the batch rather than to the whole season so far.
+    
+    Args:
+        folder_path (str): Path to the season folder
+        season_name (str): Name of the season
+        results (dict): Results to append, keyed by filename
+        output_dir (str, optional): Directory the results are saved in
+        start (bool): Replace any progress file left over from an earlier run
+    """
+    output_path = season_results_path(folder_path, season_name, output_dir, ".jsonl")
+    lines = b"".join(orjson.dumps({"filename": filename, "result": result}) + b"\n"
+                     for filename, result in results.items())
+    with open(output_path, "wb" if start else "ab") as f:
+        f.write(lines)
+
+def save_season_results(folder_path, season_name, results, output_dir=None):
+    """Save the results for a season to a JSON file, replacing its progress file"""
+    output_path = season_results_path(folder_path, season_name, output_dir)
+    
+    with open(output_path, "wb") as f:
+        f.write(orjson.dumps({season_name: results}, option=orjson.OPT_INDENT_2))
     
-    with open(output_path, "w") as f:
-        json.dump({season_name: results}, f, indent=2)
+    # The complete results are saved, so the batch progress is no longer needed
+    progress_path = season_results_path(folder_path, season_name, output_dir, ".jsonl")
+    if os.path.exists(progress_path):
+        os.remove(progress_path)
     
     print(f"Season results saved to: {output_path}")
 
@@ -206,11 +308,8 @@ def process_all_seasons(base_dir, output_file="all_seasons_data.json", batch_siz
     print(f"\nProcessing all seasons in: {base_dir}")
     
     # Find all directories in the base directory
-    season_folders = []
-    for entry in os.listdir(base_dir):
-        full_path = os.path.join(base_dir, entry)
-        if os.path.isdir(full_path):
-            season_folders.append(full_path)
+    with os.scandir(base_dir) as entries:
+        season_folders = [entry.path for entry in entries if entry.is_dir(follow_symlinks=False)]
     
     if not season_folders:
         print(f"No season folders found in {base_dir}")
@@ -219,11 +318,12 @@ def process_all_seasons(base_dir, output_file="all_seasons_data.json", batch_siz
     season_folders.sort()  # Sort folders alphabetically
     print(f"Found {len(season_folders)} season folders: {[os.path.basename(f) for f in season_folders]}")
     
-    # Process each season folder
+    # Process one season at a time so its progress output and any date
+    # prompts stay together; the images within a season already share the
+    # API pool, which is what keeps the calls concurrent
     all_results = {}
     for season_folder in season_folders:
-        season_results = process_season_folder(season_folder, batch_size, output_dir)
-        all_results.update(season_results)
+        all_results.update(process_season_folder(season_folder, batch_size, output_dir))
     
     # Save combined results
     if output_dir:
@@ -235,8 +335,8 @@ def process_all_seasons(base_dir, output_file="all_seasons_data.json", batch_siz
         # Save in the base directory
         output_path = os.path.join(base_dir, output_file)
         
-    with open(output_path, "w") as f:
-        json.dump(all_results, f, indent=2)
+    with open(output_path, "wb") as f:
+        f.write(orjson.dumps(all_results, option=orjson.OPT_INDENT_2))
     
     print(f"\nAll season results saved to: {output_path}")
     return all_results
@@ -1,13 +1,13 @@
 import os
 import sys
-import json
+import orjson
 import base64
 from dotenv import load_dotenv
 
 # Import the functions from the main module
 # from score_extractor import extract_scores_from_image, extract_scores_from_multiple_images # Original import
-from .season_processor import extract_scores_from_multiple_images # Use the one with date logic from season_processor.py
-from score_extractor import extract_scores_from_image # Keep using the one from __init__.py for the core API call logic
+from .season_processor import extract_scores_from_multiple_images, iter_scores_from_images, set_api_concurrency, IMAGE_EXTENSIONS # Use the one with date logic from season_processor.py
+from score_extractor import extract_scores_from_image, COMPRESSED_SUFFIX # Keep using the one from __init__.py for the core API call logic
 
 # Load environment variables from .env file
 load_dotenv()
@@ -18,7 +18,7 @@ def _test_with_file(image_path):
     try:
         result = extract_scores_from_image(image_path)
         print("\nExtracted data:")
-        print(json.dumps(result, indent=2))
+        print(orjson.dumps(result, option=orjson.OPT_INDENT_2).decode())
         print("\nSuccess!")
         return result
     except Exception as e:
@@ -31,51 +31,72 @@ def _test_with_multiple_files(image_paths):
     try:
         results = extract_scores_from_multiple_images(image_paths)
         print("\nExtracted data:")
-        print(json.dumps(results, indent=2))
+        print(orjson.dumps(results, option=orjson.OPT_INDENT_2).decode())
         print("\nSuccess!")
         return results
     except Exception as e:
         print(f"\nError: {str(e)}")
         return None
 
+def _write_nested_results(progress_path, output_path, season_name):
+    """Rewrite a JSON Lines progress file as the nested {season: results} JSON, one line at a time"""
+    with open(progress_path, "rb") as progress, open(output_path, "wb") as out:
+        out.write(b"{\n  " + orjson.dumps(season_name) + b": {")
+        separator = b"\n"
+        for line in progress:
+            entry = orjson.loads(line)
+            # Indent the result to its depth in the file; JSON strings never
+            # contain raw newlines, so only the structure is shifted
+            result = orjson.dumps(entry["result"], option=orjson.OPT_INDENT_2).replace(b"\n", b"\n    ")
+            out.write(separator + b"    " + orjson.dumps(entry["filename"]) + b": " + result)
+            separator = b",\n"
+        out.write(b"}\n}" if separator == b"\n" else b"\n  }\n}")
+
 def _test_with_folder(folder_path, batch_size=None):
-    """Process all image files in a folder"""
-    print(f"Processing all images in folder: {folder_path}")
+    """
+    Process all image files in a folder.
     
-    supported_extensions = ['.jpg', '.jpeg', '.png']
-    image_paths = []
+    Results are saved to extraction_results.json in the folder, in the nested
+    {season: results} structure the DB processor expects, in the order the
+    images finished. They are never all held in memory, so the path of the
+    file is returned rather than the results.
+    """
+    print(f"Processing all images in folder: {folder_path}")
     
-    for filename in os.listdir(folder_path):
-        if any(filename.lower().endswith(ext) for ext in supported_extensions):
-            file_path = os.path.join(folder_path, filename)
-            image_paths.append(file_path)
+    # Find the images in the folder, skipping our own compressed copies;
+    # scandir entries already know their full path and file type
+    with os.scandir(folder_path) as entries:
+        image_paths = [entry.path for entry in entries
+                       if entry.name.rpartition('.')[2].lower() in IMAGE_EXTENSIONS
+                       and not entry.name.lower().endswith(COMPRESSED_SUFFIX)
+                       and entry.is_file()]
     
     print(f"Found {len(image_paths)} images to process")
     
-    # If batch_size is specified, process images in batches
-    if batch_size and batch_size > 0:
-        results = {}
-        for i in range(0, len(image_paths), batch_size):
-            batch = image_paths[i:i+batch_size]
-            print(f"\nProcessing batch {i//batch_size + 1} ({len(batch)} images)")
-            batch_results = extract_scores_from_multiple_images(batch)
-            results.update(batch_results)
-    else:
-        # Process all images at once
-        results = extract_scores_from_multiple_images(image_paths)
+    # Each result is appended to a JSON Lines progress file as soon as its
+    # image finishes, so an interrupted run keeps what was already extracted
+    progress_path = os.path.join(folder_path, "extraction_results.jsonl")
+    step = batch_size if batch_size and batch_size > 0 else max(len(image_paths), 1)
+    
+    with open(progress_path, "wb") as f:
+        for i in range(0, len(image_paths), step):
+            batch = image_paths[i:i+step]
+            if step < len(image_paths):
+                print(f"\nProcessing batch {i//step + 1} ({len(batch)} images)")
+            for filename, result in iter_scores_from_images(batch):
+                f.write(orjson.dumps({"filename": filename, "result": result}) + b"\n")
+                f.flush()
     
-    # Save all results to a JSON file
+    # Build the nested structure expected by the DB processor from the
+    # progress file, with the season name taken from the folder path
     output_path = os.path.join(folder_path, "extraction_results.json")
-    # Get season name from folder path
-    season_name = os.path.basename(folder_path)
-    # Create the nested structure expected by the DB processor
-    output_data = {season_name: results}
+    _write_nested_results(progress_path, output_path, os.path.basename(folder_path))
     
-    with open(output_path, "w") as f:
-        json.dump(output_data, f, indent=2) # Save the nested structure
+    # The complete results are saved, so the progress file is no longer needed
+    os.remove(progress_path)
 
     print(f"\nAll results saved to: {output_path}")
-    return results
+    return output_path
 
 if __name__ == "__main__":
     # Check if API key is set
@@ -90,6 +111,18 @@ if __name__ == "__main__":
     parent_dir = os.path.dirname(project_root)
     default_screenshots_folder = os.path.join(parent_dir, "Screenshots")
     
+    # Optional --concurrency <n> anywhere on the command line sets how many
+    # images are sent to Claude at once (default: SCORE_CONCURRENCY or 8)
+    if "--concurrency" in sys.argv:
+        flag_index = sys.argv.index("--concurrency")
+        try:
+            concurrency = int(sys.argv[flag_index + 1])
+            set_api_concurrency(concurrency)
+            print(f"Using concurrency: {concurrency}")
+        except (IndexError, ValueError):
+            print("Invalid concurrency. Using the default.")
+        del sys.argv[flag_index:flag_index + 2]
+    
     # Simple command line interface
     if len(sys.argv) < 2:
         # Check if Screenshots folder exists
@@ -100,7 +133,7 @@ if __name__ == "__main__":
             print("Usage:")
             print("  python -m score_extractor.test_extraction <image_path>")
             print("  python -m score_extractor.test_extraction --multiple <image_path1> <image_path2> ...")
-            print("  python -m score_extractor.test_extraction --folder <folder_path> [--batch-size <size>]")
+            print("  python -m score_extractor.test_extraction --folder <folder_path> [--batch-size <size>] [--concurrency <n>]")
             print(f"\nDefault Screenshots folder not found at: {default_screenshots_folder}")
             sys.exit(1)
     elif sys.argv[1] == "--multiple" and len(sys.argv) >= 3:
@@ -2,13 +2,14 @@
 Command-line entry point for stats_reader module
 """
 import argparse
+import functools
 import sys
-from .stats_db_processor_direct import main as stats_processor_main
-from .data_cleaner import main as data_cleaner_main
-from .elo_ladder import main as elo_ladder_main
-from .reference_manager import main as reference_manager_main
 
-def main():
+# Each command's module is imported only when that command runs
+
+@functools.lru_cache(maxsize=1)
+def _build_parser():
+    """Build the command-line parser once and reuse it for every call to main"""
     parser = argparse.ArgumentParser(description="Star Wars Squadrons Statistics Reader")
     
     subparsers = parser.add_subparsers(dest="command", help="Command to run")
@@ -53,29 +54,38 @@ def main():
     elo_parser.add_argument("--k-factor", type=int, default=32,
                       help="K-factor for ELO calculation (default: 32)")
     
-    args = parser.parse_args()
+    return parser
+
+def main(argv=None):
+    """Run a stats_reader command; argv defaults to the process's command-line arguments"""
+    if argv is None:
+        argv = sys.argv[1:]
+    parser = _build_parser()
+    args = parser.parse_args(argv)
+    # Everything after the command name is handed to that command's own parser
+    command_argv = argv[1:]
     
     if args.command is None:
         # For backward compatibility, default to the process command
         print("No command specified, defaulting to 'process'")
-        sys.argv.insert(1, "process")
-        stats_processor_main()
+        from .stats_db_processor_direct import main as stats_processor_main
+        stats_processor_main(argv)
     elif args.command == "reference":
         # Run the reference database manager
-        sys.argv = [sys.argv[0]] + sys.argv[2:]  # Remove the 'reference' argument for the reference_manager parser
-        reference_manager_main()
+        from .reference_manager import main as reference_manager_main
+        reference_manager_main(command_argv)
     elif args.command == "clean":
         # Run the data cleaner
-        sys.argv = [sys.argv[0]] + sys.argv[2:]  # Remove the 'clean' argument for the data_cleaner parser
-        data_cleaner_main()
+        from .data_cleaner import main as data_cleaner_main
+        data_cleaner_main(command_argv)
     elif args.command == "process":
         # Run the stats processor
-        sys.argv = [sys.argv[0]] + sys.argv[2:]  # Remove the 'process' argument for the stats_processor parser
-        stats_processor_main()
+        from .stats_db_processor_direct import main as stats_processor_main
+        stats_processor_main(command_argv)
     elif args.command == "elo":
         # Run the ELO ladder generator
-        sys.argv = [sys.argv[0]] + sys.argv[2:]  # Remove the 'elo' argument for the elo_ladder parser
-        elo_ladder_main()
+        from .elo_ladder import main as elo_ladder_main
+        elo_ladder_main(command_argv)
     else:
         parser.print_help()
 
@@ -3,11 +3,19 @@
 Check player and match data to debug ELO ladder issues
 """
 
+import io
 import os
 import sys
+import functools
 import sqlite3
 import argparse
 
+def configure_connection(conn):
+    """Apply pragmas suited to the full-table reads of these checks"""
+    conn.execute("PRAGMA mmap_size=268435456")  # 256 MB
+    conn.execute("PRAGMA cache_size=-65536")  # 64 MB
+    conn.execute("PRAGMA temp_store=MEMORY")
+
 def check_match_player_data(db_path):
     """
     Analyze match data and player stats to identify issues
@@ -19,44 +27,66 @@ def check_match_player_data(db_path):
         print(f"Error: Database file not found: {db_path}")
         return False
         
+    # Collect the report in memory and write it to stdout in one go
+    report = io.StringIO()
+    out = functools.partial(print, file=report)
+    
     conn = sqlite3.connect(db_path)
+    configure_connection(conn)
     conn.row_factory = sqlite3.Row  # Enable row factory for named columns
     cursor = conn.cursor()
     
+    # Index the join and team columns so the mismatch checks don't scan all of player_stats.
+    # Only re-analyze when an index is new, so repeated runs leave the file untouched.
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index'")
+    existing_indexes = set(row[0] for row in cursor)
+    if not {'idx_ps_match_team_faction', 'idx_matches_teams'} <= existing_indexes:
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_ps_match_team_faction ON player_stats(match_id, team_id, faction)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_matches_teams ON matches(imperial_team_id, rebel_team_id)")
+        cursor.execute("ANALYZE")
+        conn.commit()
+    
+    # Everything after this point only reads
+    conn.execute("PRAGMA query_only=ON")
+    
     # Check match types
     cursor.execute("SELECT match_type, COUNT(*) FROM matches GROUP BY match_type")
-    print("\nMatch Type Distribution:")
-    print("-" * 40)
+    out("\nMatch Type Distribution:")
+    out("-" * 40)
     match_types = cursor.fetchall()
     for row in match_types:
-        print(f"{row[0]}: {row[1]} matches")
+        out(f"{row[0]}: {row[1]} matches")
     
-    # Check player stats per match type
-    for match_type in [row[0] for row in match_types]:
-        cursor.execute("""
-        SELECT COUNT(*) as player_count
-        FROM player_stats ps
-        JOIN matches m ON ps.match_id = m.id
-        WHERE m.match_type = ?
-        """, (match_type,))
-        
-        player_count = cursor.fetchone()[0]
-        print(f"\nPlayers in '{match_type}' matches: {player_count}")
-        
-        # Sample some players from this match type
-        cursor.execute("""
-        SELECT ps.player_id, ps.player_name, ps.faction, ps.team_id, t.name as team_name, m.id as match_id
+    # Count the player stats of every match type in one query
+    cursor.execute("""
+    SELECT m.match_type, COUNT(*) as player_count
+    FROM player_stats ps
+    JOIN matches m ON ps.match_id = m.id
+    GROUP BY m.match_type
+    """)
+    player_counts = {row[0]: row[1] for row in cursor}
+    
+    # Sample the first 5 players of every match type in one query
+    cursor.execute("""
+    WITH ranked AS (
+        SELECT ps.player_id, ps.player_name, ps.faction, ps.team_id, t.name as team_name,
+               m.id as match_id, m.match_type,
+               ROW_NUMBER() OVER (PARTITION BY m.match_type ORDER BY ps.id) as rn
         FROM player_stats ps
         JOIN matches m ON ps.match_id = m.id
         LEFT JOIN teams t ON ps.team_id = t.id
-        WHERE m.match_type = ?
-        LIMIT 5
-        """, (match_type,))
-        
-        players = cursor.fetchall()
-        print(f"Sample players in '{match_type}' matches:")
-        for player in players:
-            print(f"  {player['player_name']} ({player['faction']}) - Team: {player['team_name'] or 'None'} (ID: {player['team_id'] or 'None'})")
+    )
+    SELECT * FROM ranked WHERE rn <= 5 ORDER BY match_type, rn
+    """)
+    samples = {}
+    for player in cursor:
+        samples.setdefault(player['match_type'], []).append(player)
+    
+    for match_type in [row[0] for row in match_types]:
+        out(f"\nPlayers in '{match_type}' matches: {player_counts.get(match_type, 0)}")
+        out(f"Sample players in '{match_type}' matches:")
+        for player in samples.get(match_type, []):
+            out(f"  {player['player_name']} ({player['faction']}) - Team: {player['team_name'] or 'None'} (ID: {player['team_id'] or 'None'})")
     
     # Check for team_id in pickup matches
     cursor.execute("""
@@ -67,9 +97,9 @@ def check_match_player_data(db_path):
     """)
     
     pickup_with_team_id = cursor.fetchone()[0]
-    print(f"\nPlayer stats in pickup matches with team_id NOT NULL: {pickup_with_team_id}")
+    out(f"\nPlayer stats in pickup matches with team_id NOT NULL: {pickup_with_team_id}")
     if pickup_with_team_id > 0:
-        print("WARNING: Pickup matches should have team_id set to NULL for player stats")
+        out("WARNING: Pickup matches should have team_id set to NULL for player stats")
     
     # Check for matches with no players
     cursor.execute("""
@@ -78,17 +108,20 @@ def check_match_player_data(db_path):
     FROM matches m
     JOIN teams t_imp ON m.imperial_team_id = t_imp.id
     JOIN teams t_reb ON m.rebel_team_id = t_reb.id
-    WHERE m.id NOT IN (SELECT DISTINCT match_id FROM player_stats)
+    LEFT JOIN player_stats ps ON ps.match_id = m.id
+    WHERE ps.match_id IS NULL
     """)
     
-    empty_matches = cursor.fetchall()
-    if empty_matches:
-        print("\nMatches with no player stats:")
-        print("-" * 40)
-        for match in empty_matches:
-            print(f"Match ID: {match['id']}, Type: {match['match_type']}, Teams: {match['imperial_team']} vs {match['rebel_team']}")
-    else:
-        print("\nAll matches have player stats - good!")
+    # Stream the rows, printing the heading before the first one
+    found_empty = False
+    for match in cursor:
+        if not found_empty:
+            out("\nMatches with no player stats:")
+            out("-" * 40)
+            found_empty = True
+        out(f"Match ID: {match['id']}, Type: {match['match_type']}, Teams: {match['imperial_team']} vs {match['rebel_team']}")
+    if not found_empty:
+        out("\nAll matches have player stats - good!")
     
     # Check for team_id mismatches
     cursor.execute("""
@@ -116,20 +149,22 @@ def check_match_player_data(db_path):
     LIMIT 10
     """)
     
-    mismatches = cursor.fetchall()
-    if mismatches:
-        print("\nPlayer team_id mismatches (potential subbing):")
-        print("-" * 60)
-        for m in mismatches:
-            print(f"Player: {m['player_name']} ({m['faction']})")
-            print(f"  Assigned to: {m['player_team']} (ID: {m['team_id']})")
-            print(f"  Match team: {m['match_team']} (ID: {m['expected_team_id']})")
-            print(f"  Match ID: {m['match_id']}, Type: {m['match_type']}")
-    else:
-        print("\nNo team_id mismatches found (players are on the correct teams)")
+    found_mismatch = False
+    for m in cursor:
+        if not found_mismatch:
+            out("\nPlayer team_id mismatches (potential subbing):")
+            out("-" * 60)
+            found_mismatch = True
+        out(f"Player: {m['player_name']} ({m['faction']})")
+        out(f"  Assigned to: {m['player_team']} (ID: {m['team_id']})")
+        out(f"  Match team: {m['match_team']} (ID: {m['expected_team_id']})")
+        out(f"  Match ID: {m['match_id']}, Type: {m['match_type']}")
+    if not found_mismatch:
+        out("\nNo team_id mismatches found (players are on the correct teams)")
     
     conn.close()
-    print("\nDatabase analysis complete!")
+    out("\nDatabase analysis complete!")
+    sys.stdout.write(report.getvalue())
     return True
 
 def main():
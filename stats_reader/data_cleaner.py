@@ -1,7 +1,93 @@
 import os
 import sys
-import json
 import argparse
+import orjson
+
+# ijson is optional; with it the data file is read one season at a time
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# Errors raised for a malformed data file by whichever parser is in use
+_JSON_ERRORS = (orjson.JSONDecodeError,) + ((ijson.JSONError,) if ijson is not None else ())
+
+# Write buffer for the cleaned data file; seasons smaller than this are
+# coalesced into a single write call
+_WRITE_BUFFER_SIZE = 1024 * 1024
+
+# Player table columns and the bound row formatter shared by every row
+_PLAYER_TABLE_HEADERS = ("Player", "Position", "Score", "Kills", "Deaths", "Assists", "AI Kills", "Cap Ship DMG")
+_PLAYER_ROW_FORMAT = "{:<20} {:<15} {:<8} {:<8} {:<8} {:<8} {:<8} {:<10}".format
+
+# Integer player stats and their prompt labels, in entry order
+_PLAYER_INT_FIELDS = (
+    ("score", "Score"),
+    ("kills", "Kills"),
+    ("deaths", "Deaths"),
+    ("assists", "Assists"),
+    ("ai_kills", "AI Kills"),
+    ("cap_ship_damage", "Capital Ship Damage"),
+)
+
+# Keys the extractor has used for each side's team data, in lookup order
+_TEAM_ALIASES = {
+    "imperial": ("imperial", "Imperial", "empire", "Empire"),
+    "rebel": ("rebel", "Rebel", "new_republic", "New Republic"),
+}
+
+def resolve_team(teams_data, side):
+    """
+    Find the key and data for one side of a match's teams data.
+    
+    Args:
+        teams_data (dict): The match's "teams" dictionary
+        side (str): "imperial" or "rebel"
+    
+    Returns:
+        tuple: (team_key, team_data); the key is None and the data empty if no alias is present
+    """
+    for key in _TEAM_ALIASES[side]:
+        if key in teams_data:
+            return key, teams_data[key]
+    return None, {}
+
+def _iter_seasons(input_file):
+    """Yield (season_name, season_matches) for every season in a seasons data file"""
+    with open(input_file, 'rb') as f:
+        if ijson is not None:
+            # Stream one season at a time rather than building the whole file in memory
+            yield from ijson.kvitems(f, '', use_float=True)
+        else:
+            yield from orjson.loads(f.read()).items()
+
+def _write_cleaned_data(input_file, output_file, edits):
+    """
+    Rewrite the seasons data file one season at a time with edited matches substituted.
+    
+    Args:
+        input_file (str): Path to the original seasons data file
+        output_file (str): Path to save the cleaned data file
+        edits (dict): Edited match data keyed by (season_name, filename)
+    """
+    # Write to a temporary file first so the input is never truncated while
+    # it is still being read, even when both paths are the same
+    temp_file = f"{output_file}.tmp"
+    with open(temp_file, 'wb', buffering=_WRITE_BUFFER_SIZE) as out:
+        out.write(b"{")
+        separator = b"\n"
+        for season_name, season_matches in _iter_seasons(input_file):
+            for filename in season_matches:
+                edited = edits.get((season_name, filename))
+                if edited is not None:
+                    season_matches[filename] = edited
+            # Dump the season as a one-key object and drop its outer braces so
+            # the file matches an indented dump of the whole data set
+            out.write(separator)
+            out.write(orjson.dumps({season_name: season_matches}, option=orjson.OPT_INDENT_2)[2:-2])
+            separator = b",\n"
+        out.write(b"}" if separator == b"\n" else b"\n}")
+    os.replace(temp_file, output_file)
 
 def clean_data(input_file, output_file=None):
     """
@@ -24,48 +110,42 @@ def clean_data(input_file, output_file=None):
         print(f"Error: Input file not found: {input_file}")
         return False
     
-    # Load the JSON data
-    try:
-        with open(input_file, 'r') as f:
-            data = json.load(f)
-    except json.JSONDecodeError as e:
-        print(f"Error parsing JSON file: {e}")
-        return False
-    
-    # Track modifications
-    modified = False
+    # Edited matches keyed by (season, filename); only these are kept once
+    # their season has been reviewed
+    edits = {}
     
-    # Process each season
-    for season_name, season_matches in data.items():
-        print(f"\n{'='*50}")
-        print(f"REVIEWING SEASON: {season_name}")
-        print(f"{'='*50}")
-        
-        # Process each match in the season
-        for filename, match_data in season_matches.items():
+    try:
+        # Process each season
+        for season_name, season_matches in _iter_seasons(input_file):
             print(f"\n{'='*50}")
-            print(f"REVIEWING MATCH: {filename}")
+            print(f"REVIEWING SEASON: {season_name}")
             print(f"{'='*50}")
             
-            # Display match data in a nice format
-            pretty_print_match(match_data)
-            
-            # Ask if user wants to edit this match
-            choice = input("\nWould you like to edit this match data? (y/n) ").strip().lower()
-            if choice == 'y':
-                # Edit match data
-                match_data = edit_match_data(match_data)
-                season_matches[filename] = match_data
-                modified = True
-                print("\nMatch data updated.")
-            else:
-                print("\nSkipping to next match.")
+            # Process each match in the season
+            for filename, match_data in season_matches.items():
+                print(f"\n{'='*50}")
+                print(f"REVIEWING MATCH: {filename}")
+                print(f"{'='*50}")
+                
+                # Display match data in a nice format
+                pretty_print_match(match_data)
+                
+                # Ask if user wants to edit this match
+                choice = input("\nWould you like to edit this match data? (y/n) ").strip().lower()
+                if choice == 'y':
+                    # Edit match data
+                    edits[(season_name, filename)] = edit_match_data(match_data)
+                    print("\nMatch data updated.")
+                else:
+                    print("\nSkipping to next match.")
+    except _JSON_ERRORS as e:
+        print(f"Error parsing JSON file: {e}")
+        return False
     
     # Save modified data if changes were made
-    if modified:
-        with open(output_file, 'w') as f:
-            json.dump(data, f, indent=2)
-        print(f"\nCleaned data saved to: {output_file}")
+    if edits:
+        _write_cleaned_data(input_file, output_file, edits)
+        print(f"\nCleaned data saved to: {output_file} ({len(edits)} match(es) edited)")
     else:
         print("\nNo changes were made to the data.")
     
@@ -80,8 +160,8 @@ def pretty_print_match(match_data):
     teams_data = match_data.get("teams", {})
     
     # Handle possible variations in team naming
-    imperial_data = teams_data.get("imperial", teams_data.get("Imperial", teams_data.get("empire", teams_data.get("Empire", {}))))
-    rebel_data = teams_data.get("rebel", teams_data.get("Rebel", teams_data.get("new_republic", teams_data.get("New Republic", {}))))
+    _, imperial_data = resolve_team(teams_data, "imperial")
+    _, rebel_data = resolve_team(teams_data, "rebel")
     
     # Print imperial players
     print("\nIMPERIAL TEAM:")
@@ -111,32 +191,27 @@ def print_player_table(team_data):
             print(f"  - {player}")
         return
     
-    # Print header
-    headers = ["Player", "Position", "Score", "Kills", "Deaths", "Assists", "AI Kills", "Cap Ship DMG"]
-    header_format = "{:<20} {:<15} {:<8} {:<8} {:<8} {:<8} {:<8} {:<10}"
-    print(header_format.format(*headers))
-    print("-" * 90)
-    
-    # Print each player
+    # Build the table and print it in one write
+    lines = [_PLAYER_ROW_FORMAT(*_PLAYER_TABLE_HEADERS), "-" * 90]
     for player in players:
         if isinstance(player, dict):
-            row = [
-                player.get("player", "Unknown")[:20],
-                player.get("position", "")[:15],
-                player.get("score", 0),
-                player.get("kills", 0),
-                player.get("deaths", 0),
-                player.get("assists", 0),
-                player.get("ai_kills", 0),
-                player.get("cap_ship_damage", 0)
-            ]
             try:
-                print(header_format.format(*row))
+                lines.append(_PLAYER_ROW_FORMAT(
+                    player.get("player", "Unknown")[:20],
+                    player.get("position", "")[:15],
+                    player.get("score", 0),
+                    player.get("kills", 0),
+                    player.get("deaths", 0),
+                    player.get("assists", 0),
+                    player.get("ai_kills", 0),
+                    player.get("cap_ship_damage", 0)
+                ))
             except Exception as e:
-                print(f"Error formatting player: {player}")
-                print(f"Error details: {e}")
+                lines.append(f"Error formatting player: {player}")
+                lines.append(f"Error details: {e}")
         else:
-            print(f"  - {player}")
+            lines.append(f"  - {player}")
+    sys.stdout.write("\n".join(lines) + "\n")
 
 def edit_match_data(match_data):
     """Allow user to edit match data interactively"""
@@ -164,45 +239,25 @@ def edit_match_data(match_data):
         
         elif choice == "2" or choice == "3":
             # Edit team players
-            team_key = "imperial" if choice == "2" else "rebel"
+            side = "imperial" if choice == "2" else "rebel"
             
             # Handle possible variations in team naming
-            teams_data = edited_data.get("teams", {})
-            if choice == "2":
-                # Find imperial team key
-                for possible_key in ["imperial", "Imperial", "empire", "Empire"]:
-                    if possible_key in teams_data:
-                        team_key = possible_key
-                        break
-            else:
-                # Find rebel team key
-                for possible_key in ["rebel", "Rebel", "new_republic", "New Republic"]:
-                    if possible_key in teams_data:
-                        team_key = possible_key
-                        break
-            
-            # Get team data
-            team_data = teams_data.get(team_key, {})
-            if isinstance(team_data, dict):
-                players = team_data.get("players", [])
-            else:
-                # If team_data is directly a list of players
-                players = team_data if isinstance(team_data, list) else []
-                # Convert to proper structure
-                team_data = {"players": players}
-                teams_data[team_key] = team_data
+            teams_data = edited_data.setdefault("teams", {})
+            team_key, team_data = resolve_team(teams_data, side)
+            if team_key is None:
+                # Create the team if it doesn't exist
+                team_key = side
+                team_data = teams_data[team_key] = {"players": []}
+            elif not isinstance(team_data, dict):
+                # If team_data is directly a list of players, convert to proper structure
+                team_data = teams_data[team_key] = {"players": team_data if isinstance(team_data, list) else []}
             
-            # Create teams structure if it doesn't exist
-            if "teams" not in edited_data:
-                edited_data["teams"] = {}
-            if team_key not in edited_data["teams"]:
-                edited_data["teams"][team_key] = {"players": []}
+            # Ensure players is a list stored in the match data, so edits to it
+            # land in the match without being written back
+            if not isinstance(team_data.get("players"), list):
+                team_data["players"] = []
             
-            # Ensure players is a list
-            if not isinstance(players, list):
-                players = []
-            
-            edit_player_data(team_key, players, edited_data)
+            edit_player_data(team_key, team_data["players"])
         
         elif choice == "4":
             # View current match data
@@ -217,8 +272,8 @@ def edit_match_data(match_data):
     
     return edited_data
 
-def edit_player_data(team_key, players, edited_data):
-    """Edit player data for a specific team"""
+def edit_player_data(team_key, players):
+    """Edit player data for a specific team; players is edited in place"""
     while True:
         print(f"\nEditing {team_key.upper()} team players:")
         print("\nCurrent players:")
@@ -240,9 +295,6 @@ def edit_player_data(team_key, players, edited_data):
             # Add a new player
             new_player = create_new_player()
             players.append(new_player)
-            
-            # Update the match data
-            edited_data["teams"][team_key]["players"] = players
         
         elif choice == "2":
             # Edit an existing player
@@ -256,9 +308,6 @@ def edit_player_data(team_key, players, edited_data):
                     player = players[player_index]
                     edited_player = edit_player(player)
                     players[player_index] = edited_player
-                    
-                    # Update the match data
-                    edited_data["teams"][team_key]["players"] = players
                 else:
                     print("Invalid player number.")
             except ValueError:
@@ -278,9 +327,6 @@ def edit_player_data(team_key, players, edited_data):
                         print(f"Removed player: {removed.get('player', 'Unknown')}")
                     else:
                         print(f"Removed player: {removed}")
-                    
-                    # Update the match data
-                    edited_data["teams"][team_key]["players"] = players
                 else:
                     print("Invalid player number.")
             except ValueError:
@@ -293,6 +339,18 @@ def edit_player_data(team_key, players, edited_data):
         else:
             print("Invalid choice, please try again.")
 
+def _read_int(prompt, default=0, invalid_message=None):
+    """Read an integer from the user, returning default for empty or invalid input"""
+    value = input(prompt).strip()
+    if not value:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        if invalid_message:
+            print(invalid_message)
+        return default
+
 def create_new_player():
     """Create a new player data dictionary"""
     player = {}
@@ -300,35 +358,8 @@ def create_new_player():
     player["player"] = input("Player name: ").strip()
     player["position"] = input("Position (optional): ").strip()
     
-    try:
-        player["score"] = int(input("Score: ").strip() or "0")
-    except ValueError:
-        player["score"] = 0
-    
-    try:
-        player["kills"] = int(input("Kills: ").strip() or "0")
-    except ValueError:
-        player["kills"] = 0
-    
-    try:
-        player["deaths"] = int(input("Deaths: ").strip() or "0")
-    except ValueError:
-        player["deaths"] = 0
-    
-    try:
-        player["assists"] = int(input("Assists: ").strip() or "0")
-    except ValueError:
-        player["assists"] = 0
-    
-    try:
-        player["ai_kills"] = int(input("AI Kills: ").strip() or "0")
-    except ValueError:
-        player["ai_kills"] = 0
-    
-    try:
-        player["cap_ship_damage"] = int(input("Capital Ship Damage: ").strip() or "0")
-    except ValueError:
-        player["cap_ship_damage"] = 0
+    for field, label in _PLAYER_INT_FIELDS:
+        player[field] = _read_int(f"{label}: ")
     
     return player
 
@@ -337,20 +368,9 @@ def edit_player(player):
     edited_player = player.copy() if isinstance(player, dict) else {"player": str(player)}
     
     # Default values if not present
-    if "position" not in edited_player:
-        edited_player["position"] = ""
-    if "score" not in edited_player:
-        edited_player["score"] = 0
-    if "kills" not in edited_player:
-        edited_player["kills"] = 0
-    if "deaths" not in edited_player:
-        edited_player["deaths"] = 0
-    if "assists" not in edited_player:
-        edited_player["assists"] = 0
-    if "ai_kills" not in edited_player:
-        edited_player["ai_kills"] = 0
-    if "cap_ship_damage" not in edited_player:
-        edited_player["cap_ship_damage"] = 0
+    edited_player.setdefault("position", "")
+    for field, _ in _PLAYER_INT_FIELDS:
+        edited_player.setdefault(field, 0)
     
     print("\nEditing player. Press Enter to keep current value.")
     
@@ -362,51 +382,14 @@ def edit_player(player):
     if position:
         edited_player["position"] = position
     
-    score = input(f"Score [{edited_player.get('score', 0)}]: ").strip()
-    if score:
-        try:
-            edited_player["score"] = int(score)
-        except ValueError:
-            print("Invalid score value, keeping current value.")
-    
-    kills = input(f"Kills [{edited_player.get('kills', 0)}]: ").strip()
-    if kills:
-        try:
-            edited_player["kills"] = int(kills)
-        except ValueError:
-            print("Invalid kills value, keeping current value.")
-    
-    deaths = input(f"Deaths [{edited_player.get('deaths', 0)}]: ").strip()
-    if deaths:
-        try:
-            edited_player["deaths"] = int(deaths)
-        except ValueError:
-            print("Invalid deaths value, keeping current value.")
-    
-    assists = input(f"Assists [{edited_player.get('assists', 0)}]: ").strip()
-    if assists:
-        try:
-            edited_player["assists"] = int(assists)
-        except ValueError:
-            print("Invalid assists value, keeping current value.")
-    
-    ai_kills = input(f"AI Kills [{edited_player.get('ai_kills', 0)}]: ").strip()
-    if ai_kills:
-        try:
-            edited_player["ai_kills"] = int(ai_kills)
-        except ValueError:
-            print("Invalid AI kills value, keeping current value.")
-    
-    cap_ship_damage = input(f"Capital Ship Damage [{edited_player.get('cap_ship_damage', 0)}]: ").strip()
-    if cap_ship_damage:
-        try:
-            edited_player["cap_ship_damage"] = int(cap_ship_damage)
-        except ValueError:
-            print("Invalid capital ship damage value, keeping current value.")
+    for field, label in _PLAYER_INT_FIELDS:
+        current = edited_player[field]
+        edited_player[field] = _read_int(f"{label} [{current}]: ", current,
+                                         f"Invalid {label} value, keeping current value.")
     
     return edited_player
 
-def main():
+def main(argv=None):
     """Main entry point for the data cleaner utility"""
     parser = argparse.ArgumentParser(description="Clean extracted Star Wars Squadrons match data")
     
@@ -415,7 +398,7 @@ def main():
     parser.add_argument("--output", type=str,
                       help="Path to save the cleaned data file")
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     
     clean_data(args.input, args.output)
 
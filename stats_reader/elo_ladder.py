@@ -1,13 +1,54 @@
 """
 ELO ladder generator for Star Wars Squadrons teams
 """
+import math
 import os
 import sys
-import json
+import orjson
 import sqlite3
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+def _write_json(path, data):
+    """Write data to path as indented JSON in a single write"""
+    with open(path, "wb") as f:
+        f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+
+def _write_reports(reports):
+    """
+    Write several JSON report files at once, one thread per file
+    
+    Args:
+        reports (dict): Data to write keyed by output file path
+    """
+    with ThreadPoolExecutor(max_workers=len(reports)) as executor:
+        futures = [executor.submit(_write_json, path, data) for path, data in reports.items()]
+        # Surface any write error from the worker threads
+        for future in futures:
+            future.result()
+
+# 10 ** (x / 400) == exp(x * ln(10) / 400); math.exp is cheaper than a float power
+_LN10_OVER_400 = math.log(10) / 400
+
+def configure_connection(conn):
+    """Apply pragmas suited to the full match scans of the ladder generators"""
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-65536")  # 64 MB
+
+def ensure_match_indexes(conn):
+    """Index matches by type and date so the ladder queries read them in order without sorting"""
+    # Only re-analyze when an index is new, so repeated runs leave the file untouched
+    existing_indexes = set(row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'matches'"))
+    if not {'idx_matches_type_date', 'idx_matches_date'} <= existing_indexes:
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_matches_type_date ON matches(match_type, match_date, id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_matches_date ON matches(match_date)")
+        conn.execute("ANALYZE matches")
+        conn.commit()
+
 def calculate_expected_outcome(rating_a, rating_b):
     """
     Calculate the expected outcome (probability of winning) for team A
@@ -19,7 +60,7 @@ def calculate_expected_outcome(rating_a, rating_b):
     Returns:
         float: Expected outcome (probability of team A winning)
     """
-    return 1.0 / (1.0 + 10 ** ((rating_b - rating_a) / 400))
+    return 1.0 / (1.0 + math.exp((rating_b - rating_a) * _LN10_OVER_400))
 
 def calculate_new_rating(rating, expected_outcome, actual_outcome, k_factor):
     """
@@ -36,6 +77,40 @@ def calculate_new_rating(rating, expected_outcome, actual_outcome, k_factor):
     """
     return rating + k_factor * (actual_outcome - expected_outcome)
 
+def get_team_records(conn, match_type=None):
+    """
+    Count matches played, won and lost by every team in one query
+    
+    Args:
+        conn (sqlite3.Connection): Connection to the stats database
+        match_type (str, optional): Only count matches of this type
+        
+    Returns:
+        dict: (matches_played, matches_won, matches_lost) keyed by team id
+    """
+    # Plain tuples are enough here, so skip the connection's Row factory
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    
+    type_filter = "AND match_type = ?" if match_type else ""
+    params = (match_type, match_type) if match_type else ()
+    # Each match counts once for its imperial team and once for its rebel team
+    cursor.execute(f"""
+    SELECT team_id, SUM(played), SUM(won), SUM(lost)
+    FROM (
+        SELECT imperial_team_id AS team_id, 1 AS played,
+               winner = 'IMPERIAL' AS won, winner = 'REBEL' AS lost
+        FROM matches
+        WHERE winner IN ('IMPERIAL', 'REBEL') {type_filter}
+        UNION ALL
+        SELECT rebel_team_id, 1, winner = 'REBEL', winner = 'IMPERIAL'
+        FROM matches
+        WHERE winner IN ('IMPERIAL', 'REBEL') {type_filter}
+    )
+    GROUP BY team_id
+    """, params)
+    return {row[0]: (row[1], row[2], row[3]) for row in cursor.fetchall()}
+
 def generate_player_elo_ladder(db_path, output_dir="stats_reports", starting_elo=1000, k_factor=32, match_type="pickup", 
                           ladder_filename="player_elo_ladder.json", history_filename="player_elo_history.json"):
     """
@@ -59,6 +134,8 @@ def generate_player_elo_ladder(db_path, output_dir="stats_reports", starting_elo
     
     # Connect to the database
     conn = sqlite3.connect(db_path)
+    configure_connection(conn)
+    ensure_match_indexes(conn)
     conn.row_factory = sqlite3.Row  # Enable row factory for named columns
     cursor = conn.cursor()
     
@@ -116,29 +193,26 @@ def generate_player_elo_ladder(db_path, output_dir="stats_reports", starting_elo
     for player in players:
         elo_ratings[player['id']] = starting_elo
     
+    # Fetch the players of every match in one query, grouped by match and faction
+    cursor.execute("""
+    SELECT ps.match_id, ps.faction, ps.player_id, ps.player_name, ps.player_hash
+    FROM player_stats ps
+    JOIN matches m ON ps.match_id = m.id
+    WHERE m.match_type = ? AND ps.faction IN ('IMPERIAL', 'REBEL')
+    ORDER BY ps.id
+    """, (match_type,))
+    
+    match_players = {}
+    for row in cursor:
+        match_players.setdefault((row['match_id'], row['faction']), []).append(row)
+    
     # Process matches and update ELO ratings
     elo_history = []
     
     for match in matches:
         match_id = match['id']
-        
-        # Get imperial players
-        cursor.execute("""
-        SELECT player_id, player_name, player_hash
-        FROM player_stats
-        WHERE match_id = ? AND faction = 'IMPERIAL'
-        """, (match_id,))
-        
-        imperial_players = [dict(row) for row in cursor.fetchall()]
-        
-        # Get rebel players
-        cursor.execute("""
-        SELECT player_id, player_name, player_hash
-        FROM player_stats
-        WHERE match_id = ? AND faction = 'REBEL'
-        """, (match_id,))
-        
-        rebel_players = [dict(row) for row in cursor.fetchall()]
+        imperial_players = match_players.get((match_id, 'IMPERIAL'), [])
+        rebel_players = match_players.get((match_id, 'REBEL'), [])
         
         # Skip matches with no players on either side
         if not imperial_players or not rebel_players:
@@ -271,13 +345,11 @@ def generate_player_elo_ladder(db_path, output_dir="stats_reports", starting_elo
     for i, player in enumerate(ladder):
         player['rank'] = i + 1
     
-    # Save ladder to file
-    with open(os.path.join(output_dir, ladder_filename), "w") as f:
-        json.dump(ladder, f, indent=2)
-    
-    # Save history to file
-    with open(os.path.join(output_dir, history_filename), "w") as f:
-        json.dump(elo_history, f, indent=2)
+    # Save ladder and history to file
+    _write_reports({
+        os.path.join(output_dir, ladder_filename): ladder,
+        os.path.join(output_dir, history_filename): elo_history,
+    })
     
     # Display summary
     print(f"\nPlayer ELO ladder generated with {len(ladder)} players and {len(elo_history)} match updates")
@@ -315,11 +387,22 @@ def generate_elo_ladder(db_path, output_dir="stats_reports", starting_elo=1000,
     
     # Connect to the database
     conn = sqlite3.connect(db_path)
+    configure_connection(conn)
+    ensure_match_indexes(conn)
     conn.row_factory = sqlite3.Row  # Enable row factory for named columns
     cursor = conn.cursor()
     
+    # Matches are unpacked positionally and streamed straight into the rating
+    # loop, so fetch them as plain tuples rather than Rows
+    match_cursor = conn.cursor()
+    match_cursor.row_factory = None
+    
+    # Run every read below in one transaction so they share a single snapshot
+    # and lock instead of taking one per query
+    conn.execute("BEGIN")
+    
     # Query matches of the specific type ordered by date
-    cursor.execute("""
+    match_cursor.execute("""
     SELECT m.id, m.match_date, m.winner,
            t_imp.id as imperial_team_id, t_imp.name as imperial_team_name,
            t_reb.id as rebel_team_id, t_reb.name as rebel_team_name,
@@ -333,8 +416,6 @@ def generate_elo_ladder(db_path, output_dir="stats_reports", starting_elo=1000,
     ORDER BY m.match_date, m.id
     """, (match_type,))
     
-    matches = [dict(row) for row in cursor.fetchall()]
-    
     # Initialize ELO ratings for teams
     elo_ratings = {}
     
@@ -348,28 +429,20 @@ def generate_elo_ladder(db_path, output_dir="stats_reports", starting_elo=1000,
     # Process matches and update ELO ratings
     elo_history = []
     
-    for match in matches:
-        imperial_id = match['imperial_team_id']
-        rebel_id = match['rebel_team_id']
-        imperial_name = match['imperial_team_name']
-        rebel_name = match['rebel_team_name']
-        
-        # Ensure both teams have an ELO rating
-        if imperial_id not in elo_ratings:
-            elo_ratings[imperial_id] = starting_elo
-        if rebel_id not in elo_ratings:
-            elo_ratings[rebel_id] = starting_elo
-        
-        # Get current ratings
-        imperial_rating = elo_ratings[imperial_id]
-        rebel_rating = elo_ratings[rebel_id]
+    ratings_get = elo_ratings.get
+    for match_id, match_date, winner, imperial_id, imperial_name, rebel_id, rebel_name, season in match_cursor:
+        # Get current ratings; teams without one start at the default
+        imperial_rating = ratings_get(imperial_id, starting_elo)
+        rebel_rating = ratings_get(rebel_id, starting_elo)
         
-        # Calculate expected outcomes
-        imperial_expected = calculate_expected_outcome(imperial_rating, rebel_rating)
+        # Calculate expected outcomes; this and the rating update below are
+        # calculate_expected_outcome and calculate_new_rating inlined, as
+        # this loop runs once per match
+        imperial_expected = 1.0 / (1.0 + math.exp((rebel_rating - imperial_rating) * _LN10_OVER_400))
         rebel_expected = 1.0 - imperial_expected
         
         # Determine actual outcomes
-        if match['winner'] == 'IMPERIAL':
+        if winner == 'IMPERIAL':
             imperial_actual = 1.0
             rebel_actual = 0.0
         else:  # REBEL
@@ -377,8 +450,8 @@ def generate_elo_ladder(db_path, output_dir="stats_reports", starting_elo=1000,
             rebel_actual = 1.0
         
         # Calculate new ratings
-        new_imperial_rating = calculate_new_rating(imperial_rating, imperial_expected, imperial_actual, k_factor)
-        new_rebel_rating = calculate_new_rating(rebel_rating, rebel_expected, rebel_actual, k_factor)
+        new_imperial_rating = imperial_rating + k_factor * (imperial_actual - imperial_expected)
+        new_rebel_rating = rebel_rating + k_factor * (rebel_actual - rebel_expected)
         
         # Update ratings
         elo_ratings[imperial_id] = new_imperial_rating
@@ -386,9 +459,9 @@ def generate_elo_ladder(db_path, output_dir="stats_reports", starting_elo=1000,
         
         # Record history
         elo_history.append({
-            'match_id': match['id'],
-            'match_date': match['match_date'],
-            'season': match['season'],
+            'match_id': match_id,
+            'match_date': match_date,
+            'season': season,
             'imperial': {
                 'team_id': imperial_id,
                 'team_name': imperial_name,
@@ -403,38 +476,18 @@ def generate_elo_ladder(db_path, output_dir="stats_reports", starting_elo=1000,
                 'new_rating': new_rebel_rating,
                 'rating_change': new_rebel_rating - rebel_rating
             },
-            'winner': match['winner']
+            'winner': winner
         })
     
     # Build the final ladder
+    team_records = get_team_records(conn, match_type)
+    conn.commit()
     ladder = []
     for team in teams:
         team_id = team['id']
         if team_id in elo_ratings:
-            # Count matches played and won
-            cursor.execute("""
-            SELECT 
-                COUNT(*) as matches_played,
-                SUM(CASE WHEN 
-                        (imperial_team_id = ? AND winner = 'IMPERIAL') OR
-                        (rebel_team_id = ? AND winner = 'REBEL')
-                    THEN 1 ELSE 0 END) as matches_won,
-                SUM(CASE WHEN
-                        (imperial_team_id = ? AND winner = 'REBEL') OR
-                        (rebel_team_id = ? AND winner = 'IMPERIAL')
-                    THEN 1 ELSE 0 END) as matches_lost
-            FROM matches
-            WHERE (imperial_team_id = ? OR rebel_team_id = ?) 
-            AND winner IN ('IMPERIAL', 'REBEL')
-            AND match_type = ?
-            """, (team_id, team_id, team_id, team_id, team_id, team_id, match_type))
-            
-            stats = dict(cursor.fetchone())
-            
-            # Fix for win rate calculation
-            matches_played = stats['matches_played'] or 0
-            matches_won = stats['matches_won'] or 0
-            matches_lost = stats['matches_lost'] or 0
+            # Teams with no decided matches have no record
+            matches_played, matches_won, matches_lost = team_records.get(team_id, (0, 0, 0))
             
             # Make sure we don't divide by zero
             win_rate = 0
@@ -458,15 +511,13 @@ def generate_elo_ladder(db_path, output_dir="stats_reports", starting_elo=1000,
     for i, team in enumerate(ladder):
         team['rank'] = i + 1
     
-    # Save ladder to file with match type in filename
+    # Save ladder and history to files with match type in filename
     ladder_filename = f"elo_ladder_{match_type}.json"
-    with open(os.path.join(output_dir, ladder_filename), "w") as f:
-        json.dump(ladder, f, indent=2)
-    
-    # Save history to file with match type in filename
     history_filename = f"elo_history_{match_type}.json"
-    with open(os.path.join(output_dir, history_filename), "w") as f:
-        json.dump(elo_history, f, indent=2)
+    _write_reports({
+        os.path.join(output_dir, ladder_filename): ladder,
+        os.path.join(output_dir, history_filename): elo_history,
+    })
     
     # Display summary
     print(f"\n{match_type.capitalize()} ELO ladder generated with {len(ladder)} teams and {len(elo_history)} match updates")
@@ -504,11 +555,22 @@ def generate_combined_ladder(db_path, output_dir="stats_reports", starting_elo=1
     
     # Connect to the database
     conn = sqlite3.connect(db_path)
+    configure_connection(conn)
+    ensure_match_indexes(conn)
     conn.row_factory = sqlite3.Row  # Enable row factory for named columns
     cursor = conn.cursor()
     
+    # Matches are unpacked positionally and streamed straight into the rating
+    # loop, so fetch them as plain tuples rather than Rows
+    match_cursor = conn.cursor()
+    match_cursor.row_factory = None
+    
+    # Run every read below in one transaction so they share a single snapshot
+    # and lock instead of taking one per query
+    conn.execute("BEGIN")
+    
     # Query all matches ordered by date
-    cursor.execute("""
+    match_cursor.execute("""
     SELECT m.id, m.match_date, m.winner,
            t_imp.id as imperial_team_id, t_imp.name as imperial_team_name,
            t_reb.id as rebel_team_id, t_reb.name as rebel_team_name,
@@ -521,8 +583,6 @@ def generate_combined_ladder(db_path, output_dir="stats_reports", starting_elo=1
     ORDER BY m.match_date
     """)
     
-    matches = [dict(row) for row in cursor.fetchall()]
-    
     # Initialize ELO ratings for teams
     elo_ratings = {}
     
@@ -536,28 +596,20 @@ def generate_combined_ladder(db_path, output_dir="stats_reports", starting_elo=1
     # Process matches and update ELO ratings
     elo_history = []
     
-    for match in matches:
-        imperial_id = match['imperial_team_id']
-        rebel_id = match['rebel_team_id']
-        imperial_name = match['imperial_team_name']
-        rebel_name = match['rebel_team_name']
-        
-        # Ensure both teams have an ELO rating
-        if imperial_id not in elo_ratings:
-            elo_ratings[imperial_id] = starting_elo
-        if rebel_id not in elo_ratings:
-            elo_ratings[rebel_id] = starting_elo
+    ratings_get = elo_ratings.get
+    for match_id, match_date, winner, imperial_id, imperial_name, rebel_id, rebel_name, season in match_cursor:
+        # Get current ratings; teams without one start at the default
+        imperial_rating = ratings_get(imperial_id, starting_elo)
+        rebel_rating = ratings_get(rebel_id, starting_elo)
         
-        # Get current ratings
-        imperial_rating = elo_ratings[imperial_id]
-        rebel_rating = elo_ratings[rebel_id]
-        
-        # Calculate expected outcomes
-        imperial_expected = calculate_expected_outcome(imperial_rating, rebel_rating)
+        # Calculate expected outcomes; this and the rating update below are
+        # calculate_expected_outcome and calculate_new_rating inlined, as
+        # this loop runs once per match
+        imperial_expected = 1.0 / (1.0 + math.exp((rebel_rating - imperial_rating) * _LN10_OVER_400))
         rebel_expected = 1.0 - imperial_expected
         
         # Determine actual outcomes
-        if match['winner'] == 'IMPERIAL':
+        if winner == 'IMPERIAL':
             imperial_actual = 1.0
             rebel_actual = 0.0
         else:  # REBEL
@@ -565,8 +617,8 @@ def generate_combined_ladder(db_path, output_dir="stats_reports", starting_elo=1
             rebel_actual = 1.0
         
         # Calculate new ratings
-        new_imperial_rating = calculate_new_rating(imperial_rating, imperial_expected, imperial_actual, k_factor)
-        new_rebel_rating = calculate_new_rating(rebel_rating, rebel_expected, rebel_actual, k_factor)
+        new_imperial_rating = imperial_rating + k_factor * (imperial_actual - imperial_expected)
+        new_rebel_rating = rebel_rating + k_factor * (rebel_actual - rebel_expected)
         
         # Update ratings
         elo_ratings[imperial_id] = new_imperial_rating
@@ -574,9 +626,9 @@ def generate_combined_ladder(db_path, output_dir="stats_reports", starting_elo=1
         
         # Record history
         elo_history.append({
-            'match_id': match['id'],
-            'match_date': match['match_date'],
-            'season': match['season'],
+            'match_id': match_id,
+            'match_date': match_date,
+            'season': season,
             'imperial': {
                 'team_id': imperial_id,
                 'team_name': imperial_name,
@@ -591,36 +643,18 @@ def generate_combined_ladder(db_path, output_dir="stats_reports", starting_elo=1
                 'new_rating': new_rebel_rating,
                 'rating_change': new_rebel_rating - rebel_rating
             },
-            'winner': match['winner']
+            'winner': winner
         })
     
     # Build the final ladder
+    team_records = get_team_records(conn)
+    conn.commit()
     ladder = []
     for team in teams:
         team_id = team['id']
         if team_id in elo_ratings:
-            # Count matches played and won (all match types)
-            cursor.execute("""
-            SELECT 
-                COUNT(*) as matches_played,
-                SUM(CASE WHEN 
-                        (imperial_team_id = ? AND winner = 'IMPERIAL') OR
-                        (rebel_team_id = ? AND winner = 'REBEL')
-                    THEN 1 ELSE 0 END) as matches_won,
-                SUM(CASE WHEN
-                        (imperial_team_id = ? AND winner = 'REBEL') OR
-                        (rebel_team_id = ? AND winner = 'IMPERIAL')
-                    THEN 1 ELSE 0 END) as matches_lost
-            FROM matches
-            WHERE (imperial_team_id = ? OR rebel_team_id = ?) AND winner IN ('IMPERIAL', 'REBEL')
-            """, (team_id, team_id, team_id, team_id, team_id, team_id))
-            
-            stats = dict(cursor.fetchone())
-            
-            # Fix for win rate calculation
-            matches_played = stats['matches_played'] or 0
-            matches_won = stats['matches_won'] or 0
-            matches_lost = stats['matches_lost'] or 0
+            # Teams with no decided matches have no record
+            matches_played, matches_won, matches_lost = team_records.get(team_id, (0, 0, 0))
             
             # Make sure we don't divide by zero
             win_rate = 0
@@ -644,13 +678,11 @@ def generate_combined_ladder(db_path, output_dir="stats_reports", starting_elo=1
     for i, team in enumerate(ladder):
         team['rank'] = i + 1
     
-    # Save ladder to file (original filenames for backward compatibility)
-    with open(os.path.join(output_dir, "elo_ladder.json"), "w") as f:
-        json.dump(ladder, f, indent=2)
-    
-    # Save history to file (original filenames for backward compatibility)
-    with open(os.path.join(output_dir, "elo_history.json"), "w") as f:
-        json.dump(elo_history, f, indent=2)
+    # Save ladder and history to file (original filenames for backward compatibility)
+    _write_reports({
+        os.path.join(output_dir, "elo_ladder.json"): ladder,
+        os.path.join(output_dir, "elo_history.json"): elo_history,
+    })
     
     # Display summary
     print(f"\nCombined ELO ladder generated with {len(ladder)} teams and {len(elo_history)} match updates")
@@ -662,7 +694,7 @@ def generate_combined_ladder(db_path, output_dir="stats_reports", starting_elo=1
     return ladder, elo_history
 
 
-def main():
+def main(argv=None):
     """Command-line entry point"""
     parser = argparse.ArgumentParser(description="Generate ELO ladder from Star Wars Squadrons match data")
     
@@ -677,7 +709,7 @@ def main():
     parser.add_argument("--match-type", type=str, choices=["team", "pickup", "ranked", "all"], default="all",
                       help="Generate ELO ladder only for a specific match type (default: all)")
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     
     # Check that database exists
     if not os.path.exists(args.db):
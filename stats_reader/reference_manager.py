@@ -1133,7 +1133,7 @@ def populate_players_from_json(ref_db, json_path):
         print(f"Skipped {skipped_count} entries (potentially empty or error).")
 
 
-def main():
+def main(argv=None):
     parser = argparse.ArgumentParser(description="Manage the Squadrons reference database.")
     parser.add_argument('--db', default='squadrons_reference.db', help='Path to the reference SQLite database file (default: squadrons_reference.db).')
     parser.add_argument('--manage', action='store_true', help='Enter interactive management mode.')
@@ -1141,7 +1141,7 @@ def main():
     parser.add_argument('--export-json', help='Path to export the reference database data to JSON.')
     parser.add_argument('--populate-from-json', help='Path to a seasons data JSON file (like all_seasons_data.json) to populate initial player names from.')
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
     # Ensure the database directory exists if specified with a path
     db_dir = os.path.dirname(args.db)
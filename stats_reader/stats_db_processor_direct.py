@@ -23,7 +23,7 @@ except ImportError:
     ReferenceDatabase = None
 
 
-def main():
+def main(argv=None):
     parser = argparse.ArgumentParser(description="Process Star Wars Squadrons match data into a SQLite database")
     
     parser.add_argument("--input", type=str, default="all_seasons_data.json",
@@ -41,7 +41,7 @@ def main():
     parser.add_argument("--force-update-match-types", action="store_true",
                         help="Force update of match types, even if they are already set")
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     
     if args.update_match_types or args.force_update_match_types:
         # Update match types for existing matches
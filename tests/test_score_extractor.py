@@ -1,12 +1,18 @@
 import pytest
 import os
 import json
+import threading
+from io import BytesIO
+from PIL import Image
+import score_extractor
 from unittest.mock import patch, MagicMock, call
 from score_extractor.season_processor import (
     extract_date_from_filename,
     save_season_results,
+    append_season_results,
     find_screenshots_dir,
     extract_scores_from_multiple_images,
+    iter_scores_from_images,
     process_season_folder,
     process_all_seasons
 )
@@ -104,6 +110,18 @@ def test_extract_scores_from_multiple_images(mock_extract, dummy_image_files):
     assert res3["error"] == "Simulated processing error"
 
 
+@patch('score_extractor.season_processor.extract_date_from_filename', return_value=None)
+@patch('score_extractor.season_processor.extract_scores_from_image', side_effect=mock_extract_side_effect)
+def test_iter_scores_from_images(mock_extract, mock_date, dummy_image_files):
+    """Test that streamed results match the batch results, errors included"""
+    results = dict(iter_scores_from_images(list(dummy_image_files.values())))
+    
+    assert mock_extract.call_count == 3
+    assert results["match_2024-01-01_100000.png"] == MOCK_RESULTS["match_2024-01-01_100000.png"]
+    assert results["match_no_date.jpg"] == MOCK_RESULTS["match_no_date.jpg"]
+    assert results["error_image.png"] == {"error": "Simulated processing error"}
+
+
 # === Fixture for dummy season folder structure ===
 @pytest.fixture
 def dummy_season_folder(tmp_path):
@@ -158,8 +176,9 @@ def test_process_season_folder(mock_save, mock_extract, dummy_season_folder):
 # Test with batching
 @patch('score_extractor.season_processor.extract_scores_from_multiple_images') # Mocked with side effect below
 @patch('score_extractor.season_processor.save_season_results')
+@patch('score_extractor.season_processor.append_season_results')
 @patch('score_extractor.season_processor.time.sleep', return_value=None) # Mock sleep
-def test_process_season_folder_batching(mock_sleep, mock_save, mock_extract, dummy_season_folder):
+def test_process_season_folder_batching(mock_sleep, mock_append, mock_save, mock_extract, dummy_season_folder):
     """Test processing a single season folder with batching"""
     output_dir = dummy_season_folder.parent / "Output"
     batch_size = 1 # Process one image per batch
@@ -184,8 +203,11 @@ def test_process_season_folder_batching(mock_sleep, mock_save, mock_extract, dum
     # Check that extract_scores_from_multiple_images was called twice (once per batch)
     assert mock_extract.call_count == 2
     
-    # Check that save_season_results was called twice (once after each batch)
-    assert mock_save.call_count == 2
+    # Check that each batch was appended, and the full season saved once at the end
+    assert mock_append.call_count == 2
+    assert mock_append.call_args_list[0].kwargs["start"] is True
+    assert mock_append.call_args_list[1].kwargs["start"] is False
+    assert mock_save.call_count == 1
     
     # Check the final returned results (should be combined from batches)
     assert season_name in season_results
@@ -199,6 +221,28 @@ def test_process_season_folder_batching(mock_sleep, mock_save, mock_extract, dum
     assert mock_sleep.call_count == 1
 
 
+def test_append_and_save_season_results(tmp_path):
+    """Test that batch progress is appended as JSON lines and replaced by the final save"""
+    output_dir = tmp_path / "Output"
+    progress_path = output_dir / "S1" / "S1_results.jsonl"
+    
+    append_season_results(str(tmp_path), "S1", {"img1.png": {"r": 1}}, str(output_dir), start=True)
+    append_season_results(str(tmp_path), "S1", {"img2.png": {"r": 2}}, str(output_dir))
+    
+    lines = [json.loads(line) for line in progress_path.read_text().splitlines()]
+    assert lines == [
+        {"filename": "img1.png", "result": {"r": 1}},
+        {"filename": "img2.png", "result": {"r": 2}},
+    ]
+    
+    results = {"img1.png": {"r": 1}, "img2.png": {"r": 2}}
+    save_season_results(str(tmp_path), "S1", results, str(output_dir))
+    
+    with open(output_dir / "S1" / "S1_results.json") as f:
+        assert json.load(f) == {"S1": results}
+    assert not progress_path.exists()
+
+
 # === Fixture for dummy base directory structure ===
 @pytest.fixture
 def dummy_base_dir(tmp_path):
@@ -253,4 +297,55 @@ def test_process_all_seasons(mock_process_season, dummy_base_dir):
     # Check the content of the combined file
     with open(expected_output_path, 'r') as f:
         saved_data = json.load(f)
-    assert saved_data == all_results
\ No newline at end of file
+    assert saved_data == all_results
+
+# === Tests for score_extractor.extract_scores_from_multiple_images ===
+
+@patch('score_extractor.LAUNCH_JITTER', 0)
+@patch('score_extractor._extract_and_cache')
+@patch('score_extractor._prepare_cached')
+def test_encoded_payloads_are_bounded(mock_prepare, mock_extract, tmp_path):
+    """Test that images are only encoded a bounded amount ahead of their API calls"""
+    limit = score_extractor.MAX_CONCURRENCY + score_extractor.ENCODE_WORKERS
+    lock = threading.Lock()
+    state = {"in_flight": 0, "peak": 0}
+    
+    def prepare(image_path):
+        with lock:
+            state["in_flight"] += 1
+            state["peak"] = max(state["peak"], state["in_flight"])
+        return None, None, {"data": image_path}
+    
+    def extract(cache_path, image_source):
+        with lock:
+            state["in_flight"] -= 1
+        return {"image": os.path.basename(image_source["data"])}
+    
+    mock_prepare.side_effect = prepare
+    mock_extract.side_effect = extract
+    image_paths = [str(tmp_path / f"img{i}.png") for i in range(limit * 5)]
+    
+    results = score_extractor.extract_scores_from_multiple_images(image_paths)
+    
+    assert list(results) == [os.path.basename(path) for path in image_paths]
+    assert all(results[name] == {"image": name} for name in results)
+    assert state["peak"] <= limit
+
+# === Tests for score_extractor image compression ===
+
+def test_compressed_cropped_jpeg_keeps_full_resolution(tmp_path):
+    """Test that a cropped JPEG is encoded at the size a full-resolution decode gives"""
+    # A scoreboard band inside a black 5K frame, large enough that a reduced-scale
+    # decode of the whole frame would shrink the band below MAX_IMAGE_EDGE
+    image_path = tmp_path / "screenshot.jpg"
+    frame = Image.new("RGB", (5120, 2880))
+    frame.paste((200, 180, 160), (1760, 1240, 3360, 1640))
+    frame.save(image_path, "JPEG", quality=95)
+    
+    with Image.open(image_path) as img:
+        expected = score_extractor._crop_to_content(img.convert("RGB"))
+        expected.thumbnail((score_extractor.MAX_IMAGE_EDGE, score_extractor.MAX_IMAGE_EDGE), Image.LANCZOS)
+    
+    with Image.open(BytesIO(score_extractor._compress_image(str(image_path)))) as compressed:
+        assert compressed.size == expected.size
+    assert max(expected.size) == score_extractor.MAX_IMAGE_EDGE
@@ -11,6 +11,18 @@ import sqlite3
 from datetime import datetime
 import re
 
+# Screenshot file extensions, without the dot and in lowercase
+IMAGE_EXTENSIONS = frozenset({"png", "jpg", "jpeg"})
+# Files the score extractor writes next to the screenshots, matching score_extractor:
+# its cache folder and the compressed copies older versions left beside each image
+CACHE_DIR = ".cache"
+COMPRESSED_SUFFIX = ".compressed.jpg"
+
+def is_screenshot(name):
+    """Whether a file name is a screenshot rather than some other file or a compressed copy"""
+    return (name.rpartition('.')[2].lower() in IMAGE_EXTENSIONS
+            and not name.lower().endswith(COMPRESSED_SUFFIX))
+
 def list_screenshot_files(screenshot_dir=None):
     """
     Find all screenshot files in the Screenshots directory
@@ -26,13 +38,15 @@ def list_screenshot_files(screenshot_dir=None):
         return []
     
     screenshot_files = []
-    extensions = [".png", ".jpg", ".jpeg"]
     
     print(f"Searching for screenshots in: {screenshot_dir}")
     
     for root, dirs, files in os.walk(screenshot_dir):
+        # The extractor's cache holds compressed copies, not screenshots
+        if CACHE_DIR in dirs:
+            dirs.remove(CACHE_DIR)
         for file in files:
-            if any(file.lower().endswith(ext) for ext in extensions):
+            if is_screenshot(file):
                 screenshot_files.append(os.path.join(root, file))
     
     return screenshot_files
@@ -49,20 +63,17 @@ def check_for_seasons(screenshot_dir=None):
         print(f"Screenshots directory not found at: {screenshot_dir}")
         return
     
-    seasons = []
-    for item in os.listdir(screenshot_dir):
-        item_path = os.path.join(screenshot_dir, item)
-        if os.path.isdir(item_path) and re.match(r'SCL\d+', item):
-            seasons.append(item)
+    # scandir entries carry their full path and file type, so no joins or extra stats are needed
+    with os.scandir(screenshot_dir) as entries:
+        seasons = [entry for entry in entries if re.match(r'SCL\d+', entry.name) and entry.is_dir()]
     
     if seasons:
         print(f"Found {len(seasons)} season directories:")
         for season in seasons:
-            season_path = os.path.join(screenshot_dir, season)
-            screenshots = [f for f in os.listdir(season_path) 
-                          if os.path.isfile(os.path.join(season_path, f)) and 
-                          any(f.lower().endswith(ext) for ext in [".png", ".jpg", ".jpeg"])]
-            print(f"  - {season}: {len(screenshots)} screenshots")
+            with os.scandir(season.path) as entries:
+                screenshots = [entry for entry in entries
+                               if is_screenshot(entry.name) and entry.is_file()]
+            print(f"  - {season.name}: {len(screenshots)} screenshots")
     else:
         print("No season directories found (looking for folders like 'SCL14', 'SCL15', etc.)")
         print("You might want to organize your screenshots by season.")